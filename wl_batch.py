@@ -0,0 +1,179 @@
+"""Headless batch pricing of well scenarios.
+
+    python wl_batch.py rates.xlsx scenarios.csv -o results.csv [--workers N]
+
+Each scenario row describes one hole section of one well:
+
+    scenario, well, hole_section, package, service, qty, days, months,
+    depth, survey, hours, discount (%), tools
+
+`tools` mixes special-case group names and Specification 1 codes, separated by
+";" in CSV files or given as a list in JSON/YAML. JSON/YAML scenarios may also
+nest their sections under a "sections" key. The rate sheet is parsed once in
+the parent process and handed to every worker at start-up.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from wl_cache import load_rate_sheet
+from wl_section import price_section
+from wl_wells import quantity_overrides
+
+# Scenario field -> section input column
+scenario_inputs = {
+    "qty": "Quantity of Tools",
+    "days": "Total Days",
+    "months": "Total Months",
+    "depth": "Total Depth (ft)",
+    "survey": "Total Survey (ft)",
+    "hours": "Total Hours",
+    "discount": "Discount (%)",
+}
+
+_rates = None
+
+
+def as_number(value):
+    value = pd.to_numeric(value, errors="coerce")
+    return 0 if pd.isna(value) else value
+
+
+def _split_tools(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return []
+    return [part.strip() for part in str(value).split(";") if part.strip()]
+
+
+def _flatten(records):
+    rows = []
+    for i, record in enumerate(records):
+        record = dict(record)
+        sections = record.pop("sections", None)
+        record.setdefault("scenario", record.get("well") or f"scenario_{i + 1}")
+        if sections is None:
+            rows.append(record)
+        else:
+            rows.extend({**record, **section} for section in sections)
+    return rows
+
+
+def read_scenarios(source):
+    """Load scenario rows from a CSV, JSON or YAML path or uploaded file into a list of dicts."""
+    name = getattr(source, "name", source)
+    suffix = Path(str(name)).suffix.lower()
+    if suffix == ".csv":
+        records = pd.read_csv(source, dtype={"hole_section": str}).to_dict("records")
+    elif suffix == ".json":
+        records = json.loads(_read_text(source))
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML scenarios need PyYAML (pip install pyyaml)")
+        records = yaml.safe_load(_read_text(source))
+    else:
+        raise ValueError(f"Unsupported scenario file type: {suffix or name}")
+
+    if isinstance(records, dict):
+        records = records.get("scenarios", records.get("wells", [records]))
+    rows = _flatten(records)
+    for row in rows:
+        row["tools"] = _split_tools(row.get("tools"))
+    return rows
+
+
+def _read_text(source):
+    if hasattr(source, "read"):
+        data = source.read()
+        return data.decode("utf-8") if isinstance(data, bytes) else data
+    with open(source, encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _init_worker(rates):
+    global _rates
+    _rates = rates
+
+
+def price_scenario(scenario_rows):
+    """Price every hole section of one scenario against the worker's rate table."""
+    priced = []
+    for row in scenario_rows:
+        inputs = {col: as_number(row.get(key)) for key, col in scenario_inputs.items()}
+        hole = str(row.get("hole_section", ""))
+        section_df, _ = price_section(
+            _rates, row.get("package"), row.get("service"), row["tools"], inputs,
+            well=row.get("well"), hole=hole, overrides=quantity_overrides(row.get("well"), hole),
+        )
+        section_df.insert(0, "Hole Section", hole)
+        section_df.insert(0, "Well", row.get("well"))
+        section_df.insert(0, "Scenario", row["scenario"])
+        priced.append(section_df)
+    return pd.concat(priced, ignore_index=True) if priced else pd.DataFrame()
+
+
+def run_batch(rates, rows, workers=None):
+    """Price all scenarios across a process pool and return one consolidated frame."""
+    scenarios = {}
+    for row in rows:
+        scenarios.setdefault(row["scenario"], []).append(row)
+
+    batches = list(scenarios.values())
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(batches) == 1:
+        _init_worker(rates)
+        results = [price_scenario(batch) for batch in batches]
+    else:
+        chunksize = max(1, len(batches) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rates,)) as pool:
+            results = list(pool.map(price_scenario, batches, chunksize=chunksize))
+
+    results = [r for r in results if not r.empty]
+    return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
+
+
+def write_results(results, path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".xlsx":
+        results.to_excel(path, index=False)
+    elif suffix == ".parquet":
+        results.to_parquet(path, index=False)
+    else:
+        results.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price wireline scenarios without the Streamlit UI.")
+    parser.add_argument("rates", help="rate workbook (.xlsx) with a Data sheet")
+    parser.add_argument("scenarios", help="scenario file (.csv, .json, .yaml)")
+    parser.add_argument("-o", "--output", default="batch_results.csv", help="result file (.csv, .xlsx, .parquet)")
+    parser.add_argument("--sheet", default="Data", help="rate sheet name")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    rates = load_rate_sheet(args.rates, sheet_name=args.sheet)
+    try:
+        rows = read_scenarios(args.scenarios)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    results = run_batch(rates, rows, workers=args.workers)
+    write_results(results, args.output)
+
+    if not results.empty:
+        totals = results.groupby(["Scenario", "Hole Section"], sort=False)["Total (MYR)"].sum()
+        print(totals.to_string())
+        print(f"Grand Total (MYR): {results['Total (MYR)'].sum():,.2f}")
+    print(f"Priced {len(rows)} section(s) from {len(set(r['scenario'] for r in rows))} scenario(s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
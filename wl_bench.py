@@ -0,0 +1,238 @@
+"""Benchmarks for the pricing pipeline on synthetic rate sheets.
+
+    python wl_bench.py --sizes 500 5000 50000 1000000 [--repeat 3] [--xlsx-max 50000]
+
+Each size gets a synthetic "Data" sheet with the real column schema and
+codes drawn from the tool-group catalog. Load, filtering, group expansion,
+flat-charge assignment, recalc_costs and the Excel export are timed
+separately, and golden checks compare Total (MYR) from recalc_costs and
+from the pandas-free wl_core.price_lines against the original row-by-row loop. An
+.xlsx sample with NA strings is read by wl_ingest and by pd.read_excel to check
+they agree. Cold import times of the pricing modules are reported too.
+"""
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from wl_cache import clear_cache, compact_rate_sheet
+from wl_catalog import catalog, special_cases_map
+from wl_core import price_lines
+from wl_export import build_estimate_workbook
+from wl_index import build_rate_index, select_tools
+from wl_ingest import na_strings, read_rate_sheet, text_cols, used_cols
+from wl_normalize import normalize_rate_sheet
+from wl_pricing import assign_flat_charges, numeric_cols, rate_cols, recalc_costs
+from wl_section import (
+    apply_quantities, build_calc_table, build_display_table, expand_codes, flat_charge_sections,
+)
+
+bench_service = "STANDARD WELLS"
+bench_inputs = {
+    "Quantity of Tools": 2, "Total Days": 3, "Total Months": 1, "Total Depth (ft)": 5500,
+    "Total Survey (ft)": 500, "Total Hours": 12, "Discount (%)": 5,
+}
+
+
+def make_rate_sheet(n_rows, seed=0, packages=4):
+    """Synthetic Data sheet: catalog codes plus filler codes, spread over packages and services."""
+    rng = np.random.default_rng(seed)
+    catalog_codes = sorted({c for groups in special_cases_map.values() for codes in groups.values() for c in codes})
+    filler = [f"ZZ{i}: SYN_{i}" for i in range(max(50, n_rows // 20))]
+    codes = np.array(catalog_codes + filler, dtype=object)
+    # Catalog codes make up about a third of the rows so the group lookups hit
+    weights = np.r_[np.full(len(catalog_codes), 1 / len(catalog_codes)), np.full(len(filler), 2 / len(filler))]
+    spec = rng.choice(codes, n_rows, p=weights / weights.sum())
+    services = np.array([bench_service, "HT WELLS", None, ""], dtype=object)
+    df = pd.DataFrame({
+        "Package": rng.choice([f"Package {chr(65 + i)}" for i in range(packages)], n_rows),
+        "Service Name": rng.choice(services, n_rows, p=[0.5, 0.3, 0.15, 0.05]),
+        "Reference": [f"R-{i:07d}" for i in range(n_rows)],
+        "Specification 1": spec,
+        "Specification 2": [f"Synthetic {s}" for s in spec],
+    })
+    for col in rate_cols:
+        values = np.round(rng.gamma(2.0, 150.0, n_rows), 2)
+        values[rng.random(n_rows) < 0.4] = 0
+        df[col] = values
+    return df
+
+
+def reference_recalc_costs(df):
+    """The original row-by-row recalc_costs, kept as the golden reference."""
+    df = df.copy()
+    for col in numeric_cols:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    totals = []
+    for _, row in df.iterrows():
+        spec = str(row["Specification 1"])
+        if spec.startswith("---"):
+            totals.append(0)
+            continue
+        disc_fraction = row["Discount (%)"] / 100
+        total_flat = row.get("Total Flat Charge", 0)
+        operating_charge = (
+            (row["Depth Charge (per ft)"] * row["Total Depth (ft)"]) +
+            (row["Survey Charge (per ft)"] * row["Total Survey (ft)"]) +
+            (row["Flat Charge"] * total_flat) +
+            (row["Hourly Charge"] * row["Total Hours"])
+        ) * (1 - disc_fraction)
+        rental_charge = row["Quantity of Tools"] * (
+            (row["Daily Rate"] * row["Total Days"]) +
+            (row["Monthly Rate"] * row["Total Months"])
+        ) * (1 - disc_fraction)
+        totals.append(operating_charge + rental_charge)
+    df["Total (MYR)"] = totals
+    return df
+
+
+def reference_flat_charges(specs):
+    """The original per-group substring scan for Total Flat Charge."""
+    result = pd.Series(0, index=specs.index)
+    for charge_value, group_specs in catalog["flat_charge_groups"].items():
+        result.loc[specs.str.upper().apply(lambda x: any(spec.upper() in x for spec in group_specs))] = charge_value
+    return result
+
+
+def ingest_matches_read_excel(rates, n_rows=200):
+    """True if read_rate_sheet and pd.read_excel agree on an .xlsx sample with NA strings in text and rate cells."""
+    sample = rates.head(n_rows).astype(object).reset_index(drop=True)
+    for i, na in enumerate(na_strings):
+        for col, offset in (("Specification 2", 0), ("Reference", len(na_strings)), ("Flat Charge", 2 * len(na_strings))):
+            if i + offset < len(sample):
+                sample.loc[i + offset, col] = na
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rates.xlsx"
+        sample.to_excel(path, sheet_name="Data", index=False)
+        got = read_rate_sheet(path.read_bytes(), sheet_name="Data")
+        expected = pd.read_excel(path, sheet_name="Data", dtype={c: str for c in text_cols}).reindex(columns=used_cols)
+    try:
+        pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def _time(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def cold_import_ms(module, repeat=3):
+    """Best wall time of a fresh interpreter importing `module`, minus a bare interpreter start."""
+    def run(code):
+        return _time(lambda: subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent), repeat)[0]
+
+    return run(f"import {module}") - run("pass")
+
+
+def bench_size(n_rows, repeat=3, xlsx_max=50000, golden_max=20000, seed=0):
+    """Best-of-`repeat` milliseconds per stage for one sheet size, plus golden-check results."""
+    results = {"rows": n_rows}
+    results["normalize"], (rates, _) = _time(lambda: normalize_rate_sheet(make_rate_sheet(n_rows, seed)), 1)
+    rates = compact_rate_sheet(rates)
+    results["sheet MB"] = rates.memory_usage(deep=True).sum() / 1e6
+    package = rates["Package"].iloc[0]
+    special_cases = special_cases_map[bench_service]
+    selected = list(special_cases)
+    selected += rates.loc[rates["Specification 1"].str.startswith("ZZ"), "Specification 1"].unique()[:20].tolist()
+
+    # --- Load: the app's parser (wl_ingest) on xlsx (moderate sizes), CSV and Parquet uploads,
+    # plus a Parquet cache hit as wl_cache reads it ---
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "rates.xlsx"
+        if n_rows <= xlsx_max:
+            rates.to_excel(path, sheet_name="Data", index=False)
+            data = path.read_bytes()
+            results["load xlsx"] = _time(lambda: read_rate_sheet(data, sheet_name="Data"), 1)[0]
+        data = rates.to_csv(index=False).encode()
+        results["load csv"] = _time(lambda: read_rate_sheet(data), repeat)[0]
+        parquet = Path(tmp) / "rates.parquet"
+        rates.to_parquet(parquet, index=False)
+        data = parquet.read_bytes()
+        results["load parquet"] = _time(lambda: read_rate_sheet(data), repeat)[0]
+        results["load cache hit"] = _time(lambda: compact_rate_sheet(pd.read_parquet(parquet)), repeat)[0]
+
+    # --- Filtering ---
+    results["index build"] = _time(lambda: build_rate_index(rates), 1)[0]
+    results["filter (masks)"], _ = _time(lambda: rates[
+        (rates["Package"] == package) &
+        ((rates["Service Name"] == bench_service) | rates["Service Name"].isna() | (rates["Service Name"] == ""))
+    ], repeat)
+    expanded, used = expand_codes(selected, special_cases)
+    results["filter (index)"], df_tools = _time(lambda: select_tools(rates, package, bench_service, expanded), repeat)
+
+    # --- Group expansion ---
+    results["expand"], _ = _time(lambda: expand_codes(selected, special_cases), repeat)
+    results["display table"], display_df = _time(
+        lambda: build_display_table(df_tools, used, special_cases, catalog["special_codes"][bench_service]), repeat
+    )
+
+    # --- Flat charges ---
+    results["flat charges"], calc_df = _time(lambda: build_calc_table(display_df, bench_inputs), repeat)
+    calc_df = apply_quantities(calc_df, None, None, bench_inputs["Quantity of Tools"])
+
+    # --- Pricing ---
+    results["recalc_costs"], priced = _time(lambda: recalc_costs(calc_df), repeat)
+    results["priced rows"] = len(priced)
+    # The whole sheet priced as one table, to see recalc_costs at sheet scale
+    full_calc = build_calc_table(rates, bench_inputs)
+    full_calc["Quantity of Tools"] = bench_inputs["Quantity of Tools"]
+    results["recalc_costs (full sheet)"], _ = _time(lambda: recalc_costs(full_calc), repeat)
+
+    # --- Export ---
+    sections = [('8.5"', used, priced, flat_charge_sections(priced))]
+    results["excel export"], _ = _time(lambda: build_estimate_workbook(sections), 1)
+
+    # --- Golden checks against the original loops ---
+    sample = pd.concat([calc_df, full_calc.iloc[:max(0, golden_max - len(calc_df))]], ignore_index=True)
+    expected = reference_recalc_costs(sample)["Total (MYR)"].to_numpy()
+    got = recalc_costs(sample)["Total (MYR)"].to_numpy()
+    results["golden total"] = bool(np.allclose(expected, got, rtol=1e-12, atol=1e-6))
+    lines = {col: pd.to_numeric(sample[col], errors="coerce").fillna(0).to_numpy(dtype=float) for col in numeric_cols}
+    lines["Specification 1"] = sample["Specification 1"].to_numpy(dtype=object)
+    results["golden core"] = bool(np.allclose(expected, price_lines(lines)["Total (MYR)"], rtol=1e-12, atol=1e-6))
+    specs = sample["Specification 1"]
+    flat = assign_flat_charges(specs, catalog["flat_charge_index"], 0, known=catalog["flat_charges"])
+    results["golden flat"] = bool((reference_flat_charges(specs) == flat).all())
+    results["golden ingest"] = ingest_matches_read_excel(rates)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wireline pricing pipeline on synthetic rate sheets.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--xlsx-max", type=int, default=50000, help="largest sheet to round-trip through .xlsx")
+    parser.add_argument("--golden-max", type=int, default=20000, help="rows checked against the original loop")
+    parser.add_argument("-o", "--output", help="also write the results table to CSV")
+    args = parser.parse_args(argv)
+
+    clear_cache()
+    rows = [bench_size(n, args.repeat, args.xlsx_max, args.golden_max) for n in args.sizes]
+    table = pd.DataFrame(rows).set_index("rows")
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:,.2f}".format):
+        print(table.T)
+    if args.output:
+        table.to_csv(args.output)
+    imports = {module: cold_import_ms(module, args.repeat) for module in ("wl_core", "wl_section", "wl_cache")}
+    print("cold import (ms): " + ", ".join(f"{module} {ms:,.0f}" for module, ms in imports.items()))
+    if not (table["golden total"].all() and table["golden core"].all() and table["golden flat"].all()):
+        sys.exit("golden check failed: vectorized results differ from the original loop")
+    if not table["golden ingest"].all():
+        sys.exit("golden check failed: wl_ingest differs from pd.read_excel on NA strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+from wl_catalog import catalog
+from wl_ingest import read_rate_sheet
+from wl_normalize import normalize_rate_sheet
+
+# Parsed rate sheets are cached under a hash of the workbook bytes, in memory
+# and as Parquet on disk so reruns and other sessions skip the openpyxl parse.
+# Sheets are normalized once before caching; the validation report is cached
+# with them (<key>.report.parquet). Normalization uses the catalog (code
+# spellings, missing-code checks), so the catalog's digest is part of the key.
+CACHE_DIR = Path(os.environ.get("WL_CE_CACHE_DIR", Path.home() / ".cache" / "wl_ce"))
+MAX_MEMORY_ENTRIES = int(os.environ.get("WL_CE_CACHE_ENTRIES", 8))
+MAX_DISK_BYTES = int(os.environ.get("WL_CE_CACHE_BYTES", 512 * 1024 * 1024))
+# Part of every cache key; bump when normalize_rate_sheet changes so older files are re-parsed
+SHEET_FORMAT = "n2"
+
+# Tables derived from a cached sheet (priced sections) are shared the same way:
+# one process-wide LRU keyed by input fingerprint, plus a small per-session LRU
+# of references. Everything handed out here is shared and read-only.
+MAX_SHARED_RESULTS = int(os.environ.get("WL_CE_SHARED_RESULTS", 64))
+MAX_SESSION_SECTIONS = int(os.environ.get("WL_CE_SESSION_SECTIONS", 8))
+
+# Repeated text columns of the rate sheet, held as categoricals (one small code
+# per row instead of a string object); sections decode them, see wl_index
+category_cols = ["Package", "Service Name", "Specification 1", "Specification 2"]
+
+_memory = OrderedDict()
+_results = OrderedDict()
+_lock = threading.Lock()
+
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        return source.read()
+    with open(source, "rb") as fh:
+        return fh.read()
+
+
+def _disk_path(key):
+    return CACHE_DIR / f"{key}.parquet"
+
+
+def _report_path(key):
+    return CACHE_DIR / f"{key}.report.parquet"
+
+
+def _arrow_safe(df):
+    # Rate columns sometimes mix numbers and text ("n/a"); Parquet needs one type per column
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        values = df[col]
+        df[col] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+def compact_rate_sheet(df):
+    """Convert the repeated all-text columns of a freshly parsed sheet to categoricals, in place."""
+    for col in category_cols:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        values = df[col]
+        if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty") and values.nunique() <= len(values) // 2:
+            df[col] = values.astype("category")
+    return df
+
+
+def _evict_disk():
+    files = sorted(CACHE_DIR.glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    while files and total > MAX_DISK_BYTES:
+        oldest = files.pop(0)
+        total -= oldest.stat().st_size
+        oldest.unlink(missing_ok=True)
+
+
+def _persist(key, df, report):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        report.to_parquet(_report_path(key), index=False)
+        tmp = _disk_path(key).with_suffix(".tmp")
+        try:
+            df.to_parquet(tmp, index=False)
+        except Exception:
+            _arrow_safe(df).to_parquet(tmp, index=False)
+        tmp.replace(_disk_path(key))
+        _evict_disk()
+    except Exception:
+        # The disk copy is only an accelerator; a read-only or full disk must not break the app
+        pass
+
+
+def load_rate_sheet(source, sheet_name="Data"):
+    """Return the parsed rate sheet for an uploaded file, path or bytes.
+
+    Lookups go memory -> Parquet on disk -> wl_ingest.read_rate_sheet. The returned frame is
+    shared between callers and must not be modified in place.
+    """
+    return load_rate_sheet_checked(source, sheet_name)[1]
+
+
+def load_rate_sheet_checked(source, sheet_name="Data"):
+    """(key, normalized sheet, validation report) for a rate workbook or CSV/Parquet price book.
+
+    See wl_ingest for the streamed, column-projected parse and wl_normalize for the cleanup.
+    """
+    data = _read_bytes(source)
+    key = f"{file_digest(data)}-{hashlib.sha1(sheet_name.encode()).hexdigest()[:8]}-{catalog['digest'][:12]}-{SHEET_FORMAT}"
+
+    with _lock:
+        entry = lru_get(_memory, key)
+        if entry is not None:
+            return (key, *entry)
+
+    path = _disk_path(key)
+    entry = None
+    if path.exists() and _report_path(key).exists():
+        try:
+            entry = compact_rate_sheet(pd.read_parquet(path)), pd.read_parquet(_report_path(key))
+            os.utime(path)
+        except Exception:
+            entry = None
+
+    if entry is None:
+        df, report = normalize_rate_sheet(read_rate_sheet(data, sheet_name))
+        entry = compact_rate_sheet(df), report
+        _persist(key, *entry)
+
+    with _lock:
+        lru_put(_memory, key, entry, MAX_MEMORY_ENTRIES)
+    return (key, *entry)
+
+
+def lru_get(cache, key):
+    """Value for `key` in an OrderedDict LRU (marking it most recent), or None."""
+    if key not in cache:
+        return None
+    cache.move_to_end(key)
+    return cache[key]
+
+
+def lru_put(cache, key, value, max_entries):
+    """Store `value` in an OrderedDict LRU and evict the oldest entries beyond `max_entries`."""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_entries:
+        cache.popitem(last=False)
+    return value
+
+
+def shared_result(key, compute):
+    """Process-wide cached `compute()` for `key`, shared read-only by every session.
+
+    Concurrent misses may both compute; the result is the same, the last one is kept.
+    """
+    with _lock:
+        value = lru_get(_results, key)
+    if value is None:
+        value = compute()
+        with _lock:
+            lru_put(_results, key, value, MAX_SHARED_RESULTS)
+    return value
+
+
+def clear_cache(disk=False):
+    with _lock:
+        _memory.clear()
+        _results.clear()
+    if disk and CACHE_DIR.exists():
+        for path in CACHE_DIR.glob("*.parquet"):
+            path.unlink(missing_ok=True)
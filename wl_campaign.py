@@ -0,0 +1,155 @@
+"""Multi-well campaign pricing against one shared rate table.
+
+    python wl_campaign.py rates.xlsx campaign.yaml -o campaign.xlsx
+
+The campaign file uses the wl_batch scenario format with one entry per well
+(CSV rows, or JSON/YAML wells with nested "sections"). Every section's lines
+are assembled first and the whole campaign is then priced in one pass; the
+output workbook holds the priced lines plus rollups by well, section, tool
+group and rental vs operating charge, written as streaming (write-only) sheets.
+"""
+import argparse
+import sys
+from io import BytesIO
+
+import pandas as pd
+
+from wl_batch import as_number, read_scenarios, scenario_inputs
+from wl_cache import load_rate_sheet
+from wl_catalog import catalog, code_groups_map, special_cases_map, special_codes_map
+from wl_export import cell_values
+from wl_index import select_tools
+from wl_pricing import assign_flat_charges, divider_mask, numeric_cols, recalc_costs
+from wl_section import build_display_table, expand_codes, tool_groups
+from wl_wells import quantity_overrides
+
+charge_columns = ["Rental Charge (MYR)", "Operating Charge (MYR)", "Total (MYR)"]
+
+
+def _section_lines(rates, row):
+    service = row.get("service")
+    special_cases = special_cases_map.get(service, {})
+    expanded_codes, used_special_cases = expand_codes(row["tools"], special_cases)
+    df_tools = select_tools(rates, row.get("package"), service, expanded_codes)
+    if df_tools.empty:
+        return None
+    special_codes = special_codes_map.get(service, frozenset())
+    lines = build_display_table(df_tools, used_special_cases, special_cases, special_codes)
+
+    lines["Tool Group"] = tool_groups(lines, code_groups_map.get(service, {}))
+
+    lines["Well"] = row.get("well")
+    lines["Hole Section"] = str(row.get("hole_section", ""))
+    for key, col in scenario_inputs.items():
+        lines[col] = as_number(row.get(key))
+    return lines
+
+
+def apply_campaign_quantities(lines):
+    """apply_quantities for a whole campaign: each section's quantity, then its well's exceptions.
+
+    Exceptions are the catalog's plus the well library's (wl_wells.quantity_overrides).
+    """
+    specs = lines["Specification 1"].to_numpy(dtype=object)
+    qty = lines["Quantity of Tools"].to_numpy(dtype=float).copy()
+    sections = lines.groupby(["Well", "Hole Section"], sort=False, dropna=False).indices
+    for (well, hole), rows in sections.items():
+        for spec_name, override_qty in quantity_overrides(well, hole).items():
+            qty[rows[specs[rows] == spec_name]] = override_qty
+    lines["Quantity of Tools"] = qty
+    return lines
+
+
+def price_campaign(rates, rows):
+    """Priced lines for every well and section of a campaign, priced in a single pass."""
+    sections = [lines for lines in (_section_lines(rates, row) for row in rows) if lines is not None]
+    if not sections:
+        return pd.DataFrame(columns=["Well", "Hole Section", "Tool Group"] + numeric_cols + charge_columns)
+    lines = pd.concat(sections, ignore_index=True)
+
+    for col in numeric_cols:
+        if col not in lines.columns:
+            lines[col] = 0
+    lines["Total Flat Charge"] = assign_flat_charges(
+        lines["Specification 1"], catalog["flat_charge_index"], 0, known=catalog["flat_charges"]
+    )
+    lines = recalc_costs(apply_campaign_quantities(lines))
+
+    leading = ["Well", "Hole Section", "Tool Group"]
+    return lines[leading + [c for c in lines.columns if c not in leading]]
+
+
+def campaign_rollups(lines):
+    """Grouped totals of a priced campaign: by well, section, tool group and charge type."""
+    priced = lines[~divider_mask(lines)] if len(lines) else lines
+    by_well = priced.groupby("Well", sort=False, dropna=False)[charge_columns].sum()
+    by_section = priced.groupby(["Well", "Hole Section"], sort=False, dropna=False)[charge_columns].sum()
+    by_group = priced.groupby(["Well", "Hole Section", "Tool Group"], sort=False, dropna=False)[charge_columns].sum()
+    by_charge = priced[["Rental Charge (MYR)", "Operating Charge (MYR)"]].sum().rename("Campaign (MYR)").to_frame()
+    by_well.loc["Campaign Total"] = by_well.sum()
+    return {
+        "By Well": by_well,
+        "By Section": by_section,
+        "By Tool Group": by_group,
+        "By Charge Type": by_charge,
+    }
+
+
+def write_campaign(lines, rollups, path, progress=None):
+    """Write the rollup sheets and the "Lines" sheet to `path` (a file name or binary buffer).
+
+    `progress`, if given, is called with the fraction done after each sheet.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    steps = len(rollups) + 2
+    for i, (name, table) in enumerate(rollups.items(), 1):
+        ws = wb.create_sheet(title=name)
+        ws.append(["" if level is None else level for level in table.index.names] + list(table.columns))
+        keys = table.index.to_flat_index() if table.index.nlevels > 1 else [(key,) for key in table.index]
+        for key, values in zip(keys, table.itertuples(index=False, name=None)):
+            ws.append(cell_values(key) + cell_values(values))
+        if progress is not None:
+            progress(i / steps)
+
+    ws = wb.create_sheet(title="Lines")
+    ws.append(list(lines.columns))
+    for values in lines.itertuples(index=False, name=None):
+        ws.append(cell_values(values))
+    if progress is not None:
+        progress((steps - 1) / steps)
+    wb.save(path)
+
+
+def campaign_bytes(lines, rollups, progress=None):
+    """write_campaign as plain bytes, for background export jobs (see wl_jobs)."""
+    output = BytesIO()
+    write_campaign(lines, rollups, output, progress)
+    return output.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Price a multi-well campaign against one rate sheet.")
+    parser.add_argument("rates", help="rate workbook (.xlsx) with a Data sheet")
+    parser.add_argument("campaign", help="campaign file (.csv, .json, .yaml)")
+    parser.add_argument("-o", "--output", default="campaign.xlsx", help="result workbook (.xlsx)")
+    parser.add_argument("--sheet", default="Data", help="rate sheet name")
+    args = parser.parse_args(argv)
+
+    rates = load_rate_sheet(args.rates, sheet_name=args.sheet)
+    try:
+        rows = read_scenarios(args.campaign)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    lines = price_campaign(rates, rows)
+    rollups = campaign_rollups(lines)
+    write_campaign(lines, rollups, args.output)
+
+    with pd.option_context("display.float_format", "{:,.2f}".format):
+        print(rollups["By Well"].to_string())
+    print(f"Priced {len(rows)} section(s) for {len({r.get('well') for r in rows})} well(s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+
+from wl_core import compile_flat_charge_groups, flat_charge_for
+
+# Tool-group catalog shared by the Streamlit app and the batch CLI. The groups
+# live in wl_catalog.json (override with WL_CE_CATALOG); the file is loaded,
+# validated and compiled once per process, and shared read-only by every session.
+
+CATALOG_PATH = Path(os.environ.get("WL_CE_CATALOG", Path(__file__).with_name("wl_catalog.json")))
+
+
+def _check_codes(where, codes):
+    if not isinstance(codes, list) or not all(isinstance(c, str) and c.strip() for c in codes):
+        raise ValueError(f"{where}: expected a list of non-empty code strings")
+
+
+def validate_catalog(raw):
+    """Raise ValueError if the raw catalog does not have the expected shape."""
+    if not isinstance(raw, dict):
+        raise ValueError("catalog must be a JSON object")
+    for service, groups in raw.get("special_cases", {}).items():
+        if not isinstance(groups, dict):
+            raise ValueError(f"special_cases[{service!r}]: expected an object of groups")
+        for group, codes in groups.items():
+            _check_codes(f"special_cases[{service!r}][{group!r}]", codes)
+    charges = set()
+    for i, entry in enumerate(raw.get("flat_charge_groups", [])):
+        if not isinstance(entry, dict) or not isinstance(entry.get("charge"), (int, float)):
+            raise ValueError(f"flat_charge_groups[{i}]: expected {{'charge': number, 'specs': [...]}}")
+        if entry["charge"] in charges:
+            raise ValueError(f"flat_charge_groups[{i}]: charge {entry['charge']} is listed twice")
+        charges.add(entry["charge"])
+        _check_codes(f"flat_charge_groups[{i}]", entry.get("specs"))
+    for well, holes in raw.get("quantity_exceptions", {}).items():
+        for hole, codes in holes.items():
+            if not all(isinstance(q, (int, float)) for q in codes.values()):
+                raise ValueError(f"quantity_exceptions[{well!r}][{hole!r}]: quantities must be numbers")
+
+
+def compile_catalog(raw):
+    """Precompute the lookups the section pipeline needs from a validated raw catalog."""
+    validate_catalog(raw)
+    special_cases = raw.get("special_cases", {})
+    flat_groups = {entry["charge"]: entry["specs"] for entry in raw.get("flat_charge_groups", [])}
+
+    special_codes = {}
+    code_groups = {}
+    for service, groups in special_cases.items():
+        special_codes[service] = frozenset(code for codes in groups.values() for code in codes)
+        reverse = {}
+        for group, codes in groups.items():
+            for code in dict.fromkeys(codes):
+                reverse.setdefault(code, []).append(group)
+        code_groups[service] = reverse
+
+    # Flat charge of every catalog code and group divider, resolved ahead of time
+    flat_index = compile_flat_charge_groups(flat_groups)
+    known = set()
+    for groups in special_cases.values():
+        for group, codes in groups.items():
+            known.update(codes)
+            known.update([group, f"--- {group} ---"])
+    flat_charges = {spec.upper(): flat_charge_for(spec.upper(), flat_index) for spec in known}
+
+    return {
+        "special_cases": special_cases,
+        "special_codes": special_codes,
+        "code_groups": code_groups,
+        "flat_charge_groups": flat_groups,
+        "flat_charge_index": flat_index,
+        "flat_charges": flat_charges,
+        "quantity_exceptions": {
+            well: {hole: {code.strip(): qty for code, qty in codes.items()} for hole, codes in holes.items()}
+            for well, holes in raw.get("quantity_exceptions", {}).items()
+        },
+    }
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@lru_cache(maxsize=4)
+def load_catalog(path=CATALOG_PATH):
+    """Compiled catalog for `path`, cached for the life of the process (read-only mappings and tuples).
+
+    "digest" identifies the catalog's content, for caches of anything derived from it.
+    """
+    with open(path, encoding="utf-8") as fh:
+        raw = json.load(fh)
+    compiled = compile_catalog(raw)
+    compiled["digest"] = hashlib.sha1(json.dumps(raw, sort_keys=True).encode()).hexdigest()
+    return freeze(compiled)
+
+
+catalog = load_catalog()
+special_cases_map = catalog["special_cases"]
+special_codes_map = catalog["special_codes"]
+code_groups_map = catalog["code_groups"]
+flat_charge_groups = catalog["flat_charge_groups"]
+quantity_exceptions = catalog["quantity_exceptions"]
@@ -1,41 +1,44 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from io import BytesIO
+from collections import OrderedDict
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Alignment, PatternFill
+
+from wl_batch import read_scenarios
+from wl_cache import MAX_SESSION_SECTIONS, file_digest, load_rate_sheet_checked, lru_get, lru_put, shared_result
+from wl_campaign import campaign_bytes, campaign_rollups, price_campaign
+from wl_catalog import code_groups_map, special_cases_map, special_codes_map
+from wl_cube import build_cube, grid, input_range, rollup, sweep, sweep_params, tornado
+from wl_export import build_estimate_bytes, estimate_fingerprint
+from wl_index import list_packages, list_services, select_tools, service_codes
+from wl_jobs import job_status, submit_job
+from wl_journal import current_table, editor_deltas, journal_frame, record_step, redo, section_journal, undo
+from wl_montecarlo import distributions, simulate, uncertain_params
+from wl_normalize import report_summary
+from wl_optimize import optimize_selection
+from wl_pricing import recalc_costs
+from wl_reprice import estimate_lines
+from wl_section import (
+    apply_quantities, build_calc_table, build_display_table, expand_codes, flat_charge_sections,
+    section_fingerprint,
+)
+from wl_store import compare_estimates, list_estimates, load_estimate, save_estimate
+from wl_timing import stage, timings_csv, timings_frame, timings_json
+from wl_wells import quantity_overrides, reference_wells, section_key, warm_baselines, well_defaults
 
 st.title("SMARTLog: Wireline Cost Estimator")
 
-uploaded_file = st.file_uploader("Upload Excel file", type=["xlsx"])
-
-# --- Well A definition (reference well) ---
-reference_wells = {
-    "Well A": {
-        "Package": "Package A",
-        "Service": "Standard Wells",
-        "Hole Sections": {
-            '12.25"': {"Quantity": 2, "Total Months": 1, "Depth": 5500},
-            '8.5"': {"Quantity": 2, "Total Months": 1, "Depth": 8000}
-        },
-        # Map to the special-case group keys you already use in special_cases_map
-        "Tool Groups": [
-            "PEX-Rt Scanner (150DegC Max)",
-            "ECS-NMR (150DegC Max)",
-            "Dual-OBMI DSI (150DegC Max)",   # map to DOBMI group in your special_cases_map
-            "MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)",
-            "XL Rock (150DegC Max)",
-            "Pipe Conveyed Logging",
-            "FPIT & Back-off services / Drilling ontingent Support Services",
-            "Unit, Cables & Conveyance",
-            "Personnel",
-        ]
-    }
-}
+uploaded_file = st.file_uploader("Upload rate sheet (Excel, CSV or Parquet)", type=["xlsx", "csv", "parquet"])
+timings = []  # per-stage wall time for this rerun, see wl_timing
 
 # --- Reference Well Selector (sidebar) ---
 st.sidebar.header("Reference Well Selection")
+# Library wells live in wl_wells.json (see wl_wells)
 selected_well = st.sidebar.selectbox("Reference Well", ["None"] + list(reference_wells.keys()), index=0)
+# Picking a well again after another choice reapplies its defaults: the tabs' widget state is gone by then
+if st.session_state.get("last_selected_well") != selected_well:
+    st.session_state.pop("applied_well", None)
+    st.session_state["last_selected_well"] = selected_well
 
 if uploaded_file:
     # --- Reset unique tracker when a new file is uploaded ---
@@ -48,28 +51,35 @@ if uploaded_file:
         st.session_state["unique_tracker"] = set()
         st.sidebar.success("Unique-tool tracker cleared.")
 
-    # Read data
-    df = pd.read_excel(uploaded_file, sheet_name="Data")
+    # Read data (cached by file content and normalized once, see wl_cache / wl_normalize)
+    with stage(timings, "load") as t:
+        rate_key, df, sheet_report = load_rate_sheet_checked(uploaded_file, sheet_name="Data")
+        t["rows"] = len(df)
 
     # Unique tools across sections
     unique_tools = {"AU14: AUX_SURELOC"}
 
-    # --- Well selection (top of sidebar) ---
+    # --- Reference-well baselines: every library well priced once per sheet, in the background ---
+    baseline_job = submit_job(f"baselines-{rate_key}", warm_baselines, df, rate_key)
+    baselines = baseline_job["result"] if baseline_job["state"] == "done" else {}
+
+    # --- Well selection: a newly picked library well fills every tab's inputs once ---
     st.sidebar.header("Well Selection")
-    # keep original selectbox too, but show chosen reference well state
-    well_option = selected_well  # "None" or "Well A"
+    reference_well = reference_wells.get(selected_well)
+    if reference_well is not None and st.session_state.get("applied_well") != (selected_well, rate_key):
+        st.session_state.update(well_defaults(df, selected_well))
+        st.session_state["applied_well"] = (selected_well, rate_key)
 
     # --- Dynamic Hole Section Setup ---
     st.sidebar.header("Hole Sections Setup")
-    # If Well A selected, default number of sections = 2, else default 2 (same)
-    default_num_sections = 2 if well_option == "Well A" else 2
+    default_num_sections = len(reference_well["Hole Sections"]) if reference_well is not None else 2
     num_sections = st.sidebar.number_input("Number of Hole Sections", min_value=1, max_value=5, value=default_num_sections, step=1)
 
-    # If Well A selected, use its hole sizes as defaults; otherwise use calculated defaults
+    # A reference well brings its own hole sizes; otherwise use calculated defaults
     hole_sizes = []
-    if well_option == "Well A":
-        # Use exact keys from reference_wells (keeps the inch formatting)
-        hole_sizes = list(reference_wells["Well A"]["Hole Sections"].keys())
+    if reference_well is not None:
+        # Use exact keys from the well library (keeps the inch formatting)
+        hole_sizes = list(reference_well["Hole Sections"].keys())
         # If user changed num_sections and it doesn't match default, allow editing below; but default hole sizes are used initially
         # If UI number_input changed to different value, still show fields for each index—we'll fallback to provided default formatting
         if len(hole_sizes) < num_sections:
@@ -83,24 +93,13 @@ if uploaded_file:
             hole_size = st.sidebar.text_input(f"Hole Section {i+1} Size (inches)", value=f"{12.25 - i*3.75:.2f}")
             hole_sizes.append(hole_size)
 
-    # If Well A selected, prefill session_state defaults for qty/months/depth & package/service
-    if well_option == "Well A":
-        well_info = reference_wells["Well A"]
-        for hole_size in hole_sizes:
-            # Use the exact key like '12.25"' or '8.5"'
-            if hole_size in well_info["Hole Sections"]:
-                info = well_info["Hole Sections"][hole_size]
-                # Set session state defaults (will be used by number_input default values below)
-                st.session_state.setdefault(f"qty_{hole_size}", info.get("Quantity", 2))
-                st.session_state.setdefault(f"months_{hole_size}", info.get("Total Months", 1))
-                st.session_state.setdefault(f"depth_{hole_size}", info.get("Depth", 5500))
-                # set package/service default placeholders (we'll apply when options exist)
-                st.session_state.setdefault(f"pkg_default_for_{hole_size}", well_info["Package"])
-                st.session_state.setdefault(f"svc_default_for_{hole_size}", well_info["Service"])
     # Create dynamic tabs
     tabs = st.tabs([f'{hs}" Hole Section' for hs in hole_sizes])
     section_totals = {}
     all_calc_dfs_for_excel = []  # store data for Excel download
+    # Per-session LRU of section tables keyed by input fingerprint (see wl_cache)
+    section_cache = st.session_state.setdefault("section_cache", OrderedDict())
+    section_params = {}  # sidebar inputs per section, used as Monte Carlo base values
 
     # --- Loop for each hole section ---
     for tab, hole_size in zip(tabs, hole_sizes):
@@ -110,13 +109,8 @@ if uploaded_file:
             # Sidebar inputs per section
             st.sidebar.subheader(f"Inputs for {hole_size}\" Section")
 
-            # --- Force default quantity = 0 for Well A 8.5" Hole Section ---
-            if well_option == "Well A" and hole_size == '8.5"':
-                st.session_state[f"qty_{hole_size}"] = 0  # overwrite session state
-                default_qty = 0
-            else:
-                default_qty = st.session_state.get(f"qty_{hole_size}", 2)
-            
+            default_qty = st.session_state.get(f"qty_{hole_size}", 2)
+
             quantity_tools = st.sidebar.number_input(
                 f"Quantity of Tools ({hole_size})",
                 min_value=0,
@@ -152,181 +146,134 @@ if uploaded_file:
                 disc_default_fraction = disc_default / 100.0
             else:
                 disc_default_fraction = disc_default
-            discount = st.sidebar.number_input(
+            discount_pct = st.sidebar.number_input(
                 f"Discount (%) ({hole_size})",
                 min_value=0.0,
                 max_value=100.0,
                 value=disc_default_fraction * 100,
                 key=f"disc_{hole_size}"
-            ) / 100.0
+            )
+            section_inputs = {
+                "Quantity of Tools": quantity_tools,
+                "Total Days": total_days,
+                "Total Months": total_months,
+                "Total Depth (ft)": total_depth,
+                "Total Survey (ft)": total_survey,
+                "Total Hours": total_hours,
+                "Discount (%)": discount_pct,
+            }
+            section_params[hole_size] = section_inputs
 
            # --- Package & Service ---
             st.subheader("Select Package")
-            package_options = df["Package"].dropna().unique().tolist()
-            
-            # --- Default package logic for Well A ---
-            default_pkg = None
-            if well_option == "Well A":
-                pkg_candidate = reference_wells["Well A"]["Package"]
-                if pkg_candidate in package_options:
-                    default_pkg = pkg_candidate
-            
-            if default_pkg:
-                try:
-                    selected_package = st.selectbox(
-                        "Choose Package", package_options, index=package_options.index(default_pkg), key=f"pkg_{hole_size}"
-                    )
-                except Exception:
-                    selected_package = st.selectbox("Choose Package", package_options, key=f"pkg_{hole_size}")
-            else:
-                selected_package = st.selectbox("Choose Package", package_options, key=f"pkg_{hole_size}")
-            
-            package_df = df[df["Package"] == selected_package]
-            
+            package_options = list_packages(df)
+            # A reference well's package/service/tools were put in session state by well_defaults
+            selected_package = st.selectbox("Choose Package", package_options, key=f"pkg_{hole_size}")
+
             # --- Service Name selection ---
             st.subheader("Select Service Name")
-            service_options = package_df["Service Name"].dropna().unique().tolist()
-            service_options = [svc for svc in service_options if svc.strip() != ""]  # remove empty strings
-            
-           
-            # Always allow blank option
-            if "" not in service_options:
-                service_options.append("")
-            
-            # Default service if Well A
-            default_svc = None
-            if well_option == "Well A":
-                svc_candidate = reference_wells["Well A"]["Service"]  # usually "Standard Wells"
-                if svc_candidate in service_options:
-                    default_svc = svc_candidate
-            
-            # Select Service Name
-            if default_svc:
-                try:
-                    selected_service = st.selectbox(
-                        "Choose Service Name", service_options, index=service_options.index(default_svc), key=f"svc_{hole_size}"
-                    )
-                except Exception:
-                    selected_service = st.selectbox("Choose Service Name", service_options, key=f"svc_{hole_size}")
+            # Non-blank services of the package plus an always-available blank option
+            service_options = list_services(df, selected_package)
+            if len(service_options) == 0:
+                selected_service = st.selectbox("Choose Service Name", [""], index=0, key=f"svc_{hole_size}")
             else:
-                # fallback to normal selectbox
-                if len(service_options) == 0:
-                    selected_service = st.selectbox("Choose Service Name", [""], index=0, key=f"svc_{hole_size}")
-                else:
-                    selected_service = st.selectbox("Choose Service Name", service_options, key=f"svc_{hole_size}")
-            
-            # --- Filter DataFrame based on selected service (including blanks) ---
-            df_service = package_df[
-                (package_df["Service Name"] == selected_service) | 
-                (package_df["Service Name"].isna()) | 
-                (package_df["Service Name"] == "")
-            ]
-
-
+                selected_service = st.selectbox("Choose Service Name", service_options, key=f"svc_{hole_size}")
 
             # --- Tool selection with special cases ---
-            # Build the special_cases_map exactly as in your original code so the groups match
-            code_list = df_service["Specification 1"].dropna().unique().tolist()
-            special_cases_map = {
-                "STANDARD WELLS": {
-                    "PEX-Rt Scanner (150DegC Max)": ["AU14: AUX_SURELOC","NE1: NEUT_THER","DE1: DENS_FULL","RE4: RES_ANIS"],
-                    "PEX-AIT (150DegC Max)": ["AU14: AUX_SURELOC","GR1: GR_TOTL","NE1: NEUT_THER","DE1: DENS_FULL","RE1: RES_INDU"],
-                    "PEX-AIT-DSI (150DegC Max)": ["AU14: AUX_SURELOC","GR1: GR_TOTL","NE1: NEUT_THER","DE1: DENS_FULL","RE1: RES_INDU",
-                                                 "AU3:AUX_INCL", "AU2: AUX_PCAL", "AU2: AUX_PCAL", "AC3: ACOU_3", "PP7: PROC_PETR7", "PA7: PROC_ACOU6",
-                                                 "PA11: PROC_ACOU13", "PA12: PROC_ACOU14"],
-                    "Dual-OBMI DSI (150DegC Max)": ["AU14: AUX_SURELOC","GR1: GR_TOTL","AU3: AUX_INCL","AC3: ACOU_3",
-                                            "AU2: AUX_PCAL","AU2: AUX_PCAL","PP7: PROC_PETR7","PA7: PROC_ACOU6",
-                                            "PA11: PROC_ACOU13","PA12: PROC_ACOU14","IM3: IMAG_SOBM","PI1: PROC_IMAG1",
-                                            "PI2: PROC_IMAG2","PI7: PROC_IMAG7"],
-                    "Dual OBMI-Sonic Scanner (150DegC Max) ": ["AU14: AUX_SURELOC","GR1: GR_TOTL","AU3: AUX_INCL","AC4: ACOU_ADD1",
-                                            "AU2: AUX_PCAL","AU2: AUX_PCAL","PP7: PROC_PETR7","PA7: PROC_ACOU6",
-                                            "PA11: PROC_ACOU13","PA12: PROC_ACOU14","IM3: IMAG_SOBM","PI1: PROC_IMAG1",
-                                            "PI2: PROC_IMAG2","PI7: PROC_IMAG7","PI8: PROC_IMAG8","PI9: PROC_IMAG9",
-                                            "PI12: PROC_IMAG12","PI13: PROC_IMAG13"],
-                    "MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)": ["AU14: AUX_SURELOC","FP25: FPS_SCAR","FP25: FPS_SCAR",
-                                                                      "FP18: FPS_SAMP","FP19: FPS_SPHA","FP23: FPS_TRA",
-                                                                      "FP24: FPS_TRK","FP28: FPS_FCHA_1","FP33: FPS_FCHA_6",
-                                                                      "FP34: FPS_FCHA_7","FP14: FPS_PUMP","FP14: FPS_PUMP",
-                                                                      "FP42: FPS_PROB_XLD","FP11: FPS_PROB_FO","FP26: FPS_FCON",
-                                                                      "DT3:RTDT_PER","PPT12: PROC_PT12","FP7: FPS_SPPT_2"],
-                    "ECS-NMR (150DegC Max)": ["AU14: AUX_SURELOC","GR1: GR_TOTL","EC1: ES_1","NM1: NMR_1","PN1: PROC_NMR1","PN2: PROC_NMR2","PN6: PROC_NMR6","PE1: PROC_ES1","PP1: PROC_PETR1","PP6: PROC_PETR6", "PN3: PROC_NMR3"],
-                    "IBC (PowerFlex)-CBL (150DegC Max)": ["CE1:CES_CBL","CE4:CES_CBI_3","CE6:CES_CBI_5", "DT3:RTDT_PER", "PPT13:PROC_PT13", "DT12:USI-DIG-LP-CET3"],
-                    "DSI-QuantaGeo-Rt Scanner (150DegC Max)": ["AU14: AUX_SURELOC","GR1: GR_TOTL","AU3: AUX_INCL", "AC4: ACOU_ADD1", "AC3: ACOU_3", "AU2:AUX_PCAL",
-                                                              "AU2:AUX_PCAL", "IM4:IMAG_ADD1","PI1:PROC_IMAG1", "DT4:SONIC-WELL-P/S-DIG", "PI2: PROC_IMAG2", "PI7: PROC_IMAG7",
-                                                              "PI8:PROC_IMAG8", "PI9:PROC_IMAG9", "PI12: PROC_IMAG12", "PI13: PROC_IMAG13", "RE4: RES_ANIS"],
-                    "Pipe Conveyed Logging": ["CO1: CONV_PCL"],
-                    "FPIT & Back-off services / Drilling ontingent Support Services": ["AU7: AUX_SBOX","PC5: PC_10KH2S","PR1: PR_FP","PR2: PR_BO","PR3: PR_TP","AU11: AUX_GRCCL",
-                                                                                      "PR7: PR_CST","MS1: MS_PL","MS3: MS_JB"],
-                    "Unit, Cables & Conveyance": ["LU1: LUDR_ZON2","CA9: CABL_HSOH_1","CA3: CABL_HSOH","CA8: CABL_STCH_2","DT2:RTDT_SAT"],
-                    "XL Rock (150DegC Max)": ["AU14: AUX_SURELOC","SC2: SC_ADD1","SC2: SC_ADD2"],
-                    "XL Rock (150DegC Max) With Core Detection": ["AU14: AUX_SURELOC","SC2: SC_ADD1","SC2: SC_ADD2", "SC4: SC_ADD4"],
-                    "Personnel": ["PER1:PWFE","PER2:PWSO","PER3:PWOP", "PER4:PWSE"]
-                },
-                "HT WELLS": {}
-            }
+            # Codes of the selected service (including blank-service rows), from the rate index
+            with stage(timings, "service filter", hole_size) as t:
+                code_list = service_codes(df, selected_package, selected_service)
+                t["rows"] = len(code_list)
 
             special_cases = special_cases_map.get(selected_service, {})
             code_list_with_special = list(special_cases.keys()) + code_list
 
-            # If Well A is selected, automatically preselect the Well A tool groups
-            default_selected_groups = []
-            if well_option == "Well A":
-                default_groups = reference_wells["Well A"]["Tool Groups"]
-                default_selected_groups = [g for g in default_groups if g in code_list_with_special]
-            
-                # Exclude certain groups for 12.25" Hole Section
-                if hole_size == '12.25"':
-                    exclude_services_12_25 = [
-                        "Pipe Conveyed Logging",
-                        "FPIT & Back-off services / Drilling ontingent Support Services",
-                        "Unit, Cables & Conveyance",
-                        "Personnel"
-                    ]
-                    default_selected_groups = [g for g in default_selected_groups if g not in exclude_services_12_25]
-
-            selected_codes = st.multiselect("Select Tools (by Specification 1)", code_list_with_special, default=default_selected_groups, key=f"tools_{hole_size}")
+            # Quantity exceptions of the reference well for this section (catalog + well library)
+            qty_overrides = quantity_overrides(selected_well, hole_size)
+
+            # --- Optimizer: cheapest cover of required codes, or best coverage within a budget ---
+            opt_key = f"opt_{hole_size}"
+            opt_fp = section_fingerprint(rate_key, selected_well, hole_size, selected_package, selected_service, section_inputs)
+            with st.expander("Optimize tool selection"):
+                opt_budget = st.number_input(
+                    "Budget cap (MYR, 0 = none)", min_value=0.0, value=0.0, step=10000.0, key=f"opt_budget_{hole_size}"
+                )
+                opt_required = st.multiselect("Required codes", code_list, key=f"opt_required_{hole_size}")
+                if st.button("Find selection", key=f"opt_run_{hole_size}", disabled=not (opt_budget or opt_required)):
+                    with stage(timings, "optimize", hole_size) as t:
+                        result = optimize_selection(
+                            df, selected_package, selected_service, section_inputs, selected_well, hole_size,
+                            budget=opt_budget or None, required=opt_required,
+                            overrides=qty_overrides,
+                        )
+                        t["rows"] = result["nodes"] if result else 0
+                    st.session_state[opt_key] = {"fp": opt_fp, "result": result}
+
+                # Results are only offered while the section inputs they were priced for are unchanged
+                found = st.session_state.get(opt_key)
+                if found and found["fp"] == opt_fp:
+                    result = found["result"]
+                    if result is None:
+                        st.warning("No selection covers the required codes within the budget.")
+                    else:
+                        search = "exhaustive search" if result["exhaustive"] else "search stopped at the node limit"
+                        st.write(f"**{result['cost']:,.2f} MYR** — {len(result['covered'])} code(s) covered ({result['nodes']} nodes, {search})")
+                        st.write(", ".join(result["selection"]) or "(nothing)")
+                        if opt_required and result["missing"]:
+                            st.caption(f"Not offered by the sheet: {', '.join(result['missing'])}")
+                        st.button(
+                            "Use this selection", key=f"opt_apply_{hole_size}",
+                            on_click=st.session_state.__setitem__, args=(f"tools_{hole_size}", result["selection"]),
+                        )
+
+            selected_codes = st.multiselect("Select Tools (by Specification 1)", code_list_with_special, key=f"tools_{hole_size}")
 
             # --- Expand selected special cases ---
-            expanded_codes = []
-            used_special_cases = []
-            for code in selected_codes:
-                if code in special_cases:
-                    expanded_codes.extend(special_cases[code])
-                    used_special_cases.append(code)
-                else:
-                    expanded_codes.append(code)
-
-            # --- If Well A selected AND special groups were auto-selected above, ensure the mapped codes from special_cases are included even if df_service doesn't contain all codes.
-            # df_tools picks only those present in df_service, so Excel/calculation will use what's present.
-            df_tools = df_service[df_service["Specification 1"].isin(expanded_codes)].copy()
+            with stage(timings, "expand", hole_size) as t:
+                expanded_codes, used_special_cases = expand_codes(selected_codes, special_cases)
+                t["rows"] = len(expanded_codes)
+
+            # --- Fingerprint this section's inputs; unchanged sections reuse their cached tables ---
+            safe_hole_size = hole_size.replace('"', '_').replace('.', '_')
+            calc_key = f"calc_state_{safe_hole_size}"
+            section_fp = section_key(
+                rate_key, selected_well, hole_size, selected_package, selected_service, selected_codes, section_inputs
+            )
+            cached = lru_get(section_cache, section_fp)
+            if cached is None:
+                def build_section_tables():
+                    # df_tools picks only the selected codes present for the service, so Excel/calculation use what's present.
+                    with stage(timings, "select tools", hole_size) as t:
+                        df_tools = select_tools(df, selected_package, selected_service, expanded_codes)
+                        t["rows"] = len(df_tools)
+                    if df_tools.empty:
+                        return None, None
+                    with stage(timings, "display table", hole_size) as t:
+                        display_df = build_display_table(
+                            df_tools, used_special_cases, special_cases, special_codes_map.get(selected_service)
+                        )
+                        t["rows"] = len(display_df)
+
+                    # --- Calculation
+                    #Build Calculated Cost Table from display_df
+                    with stage(timings, "calc table", hole_size, len(display_df)):
+                        calc_df = build_calc_table(display_df, section_inputs)
+                    with stage(timings, "apply_quantities", hole_size, len(calc_df)):
+                        calc_df = apply_quantities(calc_df, selected_well, hole_size, quantity_tools, qty_overrides)
+                    with stage(timings, "recalc_costs", hole_size, len(calc_df)):
+                        return display_df, recalc_costs(calc_df).reset_index(drop=True)
+
+                # Reference-well baselines, then sections priced by other sessions, are reused as-is (read-only)
+                tables = baselines.get(section_fp)
+                if tables is None:
+                    tables = shared_result(section_fp, build_section_tables)
+                display_df, working_calc_df = tables
+                cached = {"fp": section_fp, "display": display_df, "working": working_calc_df}
+                lru_put(section_cache, section_fp, cached, max(MAX_SESSION_SECTIONS, len(hole_sizes)))
 
             # --- Row-by-row display with dividers ---
-            if not df_tools.empty:
-                display_rows = []
-                
-                # --- Special cases with divider ---
-                for sc in used_special_cases:
-                    divider = pd.DataFrame({col: "" for col in df_tools.columns}, index=[0])
-                    divider["Specification 1"] = f"--- {sc} ---"
-                    display_rows.append(divider)
-                
-                    for item in special_cases[sc]:
-                        item_rows = df_tools[df_tools["Specification 1"] == item]
-                        if not item_rows.empty:
-                            display_rows.append(item_rows)  # include all rows
-                
-                # --- Non-special tools ---
-                non_special_mask = ~df_tools["Specification 1"].isin(sum(special_cases.values(), []))
-                non_special_df = df_tools[non_special_mask]
-                if not non_special_df.empty:
-                    display_rows.append(non_special_df)
-                
-                # --- Combine ---
-                if display_rows:
-                    display_df = pd.concat(display_rows, ignore_index=True)
-                else:
-                    display_df = df_tools.copy()
-
+            if cached["display"] is not None:
+                display_df = cached["display"]
 
                 def highlight_divider(row):
                     if str(row["Specification 1"]).startswith("---"):
@@ -334,166 +281,42 @@ if uploaded_file:
                     return [""] * len(row)
 
                 st.subheader(f"Selected Data - Package {selected_package}, Service {selected_service}")
-                st.dataframe(display_df.style.apply(highlight_divider, axis=1))
-
-                # --- Calculation
-                #Build Calculated Cost Table from display_df
-                calc_df = display_df.copy()
-                
-                numeric_cols = [
-                    "Quantity of Tools", "Total Days", "Total Months", "Total Depth (ft)",
-                    "Total Survey (ft)", "Total Hours", "Discount (%)", "Daily Rate",
-                    "Monthly Rate", "Depth Charge (per ft)", "Flat Charge", "Survey Charge (per ft)",
-                    "Hourly Charge", "Total Flat Charge"
-                ]
-                
-                # Ensure all numeric columns exist
-                for col in numeric_cols:
-                    if col not in calc_df.columns:
-                        calc_df[col] = 0
-                
-                # --- Assign other sidebar inputs
-                calc_df["Total Days"] = total_days
-                calc_df["Total Months"] = total_months
-                calc_df["Total Depth (ft)"] = total_depth
-                calc_df["Total Survey (ft)"] = total_survey
-                calc_df["Total Hours"] = total_hours
-                calc_df["Discount (%)"] = discount * 100
-                calc_df["Total Flat Charge"] = 0  # Start from 0
-                
-                # --- Define groups and their Total Flat Charge values ---
-                flat_charge_groups = {
-                    1: ["ECS-NMR (150DegC Max)", "PN1: PROC_NMR1", "PN2: PROC_NMR2", "PN3: PROC_NMR3",
-                        "PN6: PROC_NMR6", "PE1: PROC_ES1", "PP1: PROC_PETR1", "PP6: PROC_PETR6",
-                        "Dual-OBMI DSI (150DegC Max)", "PA12: PROC_ACOU14", "PI1: PROC_IMAG1", "PI2: PROC_IMAG2",
-                        "PI7: PROC_IMAG7", "PI8: PROC_IMAG8", "PI9: PROC_IMAG9", "PI12: PROC_IMAG12", "PI13: PROC_IMAG13",
-                        "MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)", "PPT12: PROC_PT12",
-                        "Unit, Cables & Conveyance", "DT2:RTDT_SAT"
-                    ],
-                    2: ["MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)", "FP19: FPS_SPHA", "FP23: FPS_TRA"],
-                    4: ["Dual-OBMI DSI (150DegC Max)", "PP7: PROC_PETR7", "PA7: PROC_ACOU6", "PA11: PROC_ACOU13",
-                        "MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)", "DT3:RTDT_PER"
-                    ],
-                    5: ["MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)", "FP18: FPS_SAMP", "FP28: FPS_FCHA_1",
-                        "FP33: FPS_FCHA_6", "FP34: FPS_FCHA_7", "FP11: FPS_PROB_FO", "FP26: FPS_FCON"
-                    ],
-                    10: ["MDT: LFA-QS-XLD-MIFA-Saturn-2MS (150DegC Max)", "FP42: FPS_PROB_XLD"],
-                    50: ["XL Rock (150DegC Max)", "SC2: SC_ADD1", "SC2: SC_ADD2"]
-                }
-                
-                # Apply Total Flat Charge per group
-                for charge_value, specs in flat_charge_groups.items():
-                    calc_df.loc[
-                        calc_df["Specification 1"].str.upper().apply(
-                            lambda x: any(spec.upper() in x for spec in specs)
-                        ),
-                        "Total Flat Charge"
-                    ] = charge_value
-                
-                # --- Recalc function ---
-                def recalc_costs(df):
-                    df = df.copy()
-                    for col in numeric_cols:
-                        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-                    
-                    totals = []
-                    for _, row in df.iterrows():
-                        spec = str(row["Specification 1"])
-                        if spec.startswith("---"):
-                            totals.append(0)
-                            continue
-                        disc_fraction = row["Discount (%)"] / 100
-                        total_flat = row.get("Total Flat Charge", 0)
-                        operating_charge = (
-                            (row["Depth Charge (per ft)"] * row["Total Depth (ft)"]) +
-                            (row["Survey Charge (per ft)"] * row["Total Survey (ft)"]) +
-                            (row["Flat Charge"] * total_flat) +
-                            (row["Hourly Charge"] * row["Total Hours"])
-                        ) * (1 - disc_fraction)
-                        rental_charge = row["Quantity of Tools"] * (
-                            (row["Daily Rate"] * row["Total Days"]) +
-                            (row["Monthly Rate"] * row["Total Months"])
-                        ) * (1 - disc_fraction)
-                        totals.append(operating_charge + rental_charge)
-                    df["Total (MYR)"] = totals
-                    return df
-                
-                # Sanitize hole size for session key
-                safe_hole_size = hole_size.replace('"', '_').replace('.', '_')
-                calc_key = f"calc_state_{safe_hole_size}"
-                
-                # --- Apply Well A exceptions and sidebar quantities ---
-                def apply_quantities(df, well, hole, sidebar_qty):
-                    df = df.copy()
-                    
-                    exceptions_map = {}
-                    if well == "Well A":
-                        if hole == '12.25"':
-                            exceptions_map = {
-                                "FP18: FPS_SAMP": 11,
-                                "FP19: FPS_SPHA": 4,
-                                "FP23: FPS_TRA": 4,
-                                "FP24: FPS_TRK": 1,
-                                "FP33: FPS_FCHA_6": 1,
-                                "FP34: FPS_FCHA_7": 1,
-                            }
-                        elif hole == '8.5"':
-                            exceptions_map = {
-                                "FP18: FPS_SAMP": 5,
-                                "FP19: FPS_SPHA": 2,
-                                "FP23: FPS_TRA": 2,
-                            }
-                    
-                    df["clean_spec"] = df["Specification 1"].str.strip().str.upper()
-                    
-                    # Apply exceptions first
-                    for spec_name, qty in exceptions_map.items():
-                        spec_upper = spec_name.strip().upper()
-                        df.loc[df["clean_spec"] == spec_upper, "Quantity of Tools"] = qty
-                    
-                    # Assign sidebar quantity to remaining rows
-                    mask_no_exception = ~df["clean_spec"].isin([k.strip().upper() for k in exceptions_map.keys()])
-                    df.loc[mask_no_exception, "Quantity of Tools"] = sidebar_qty
-                    
-                    df.drop(columns=["clean_spec"], inplace=True)
-                    return df
-                
-                # --- Initial calculation ---
-                calc_df = apply_quantities(calc_df, selected_well, hole_size, quantity_tools)
-                calc_df = recalc_costs(calc_df)
-                st.session_state[calc_key] = calc_df.copy()
-                
-                working_calc_df = st.session_state[calc_key].copy()
-                
-                # Include any new rows
-                missing_specs = set(calc_df["Specification 1"]) - set(working_calc_df["Specification 1"])
-                if missing_specs:
-                    working_calc_df = pd.concat(
-                        [working_calc_df, calc_df[calc_df["Specification 1"].isin(missing_specs)]],
-                        ignore_index=True
+                with stage(timings, "render", hole_size, len(display_df)):
+                    st.dataframe(display_df.style.apply(highlight_divider, axis=1))
+
+                # --- Edit journal: the editor's changes become one step of deltas per rerun ---
+                # (see wl_journal); only edited and added rows are repriced, exceptions reapplied
+                def price_rows(rows):
+                    rows = apply_quantities(rows, selected_well, hole_size, quantity_tools, qty_overrides)
+                    return recalc_costs(rows)
+
+                # Edits are positional, so a new tool/package/service selection starts a new journal
+                rows_key = section_fingerprint(rate_key, hole_size, selected_package, selected_service, selected_codes)
+                journal = section_journal(st.session_state, f"journal_{safe_hole_size}", rows_key)
+                with stage(timings, "edit journal", hole_size) as t:
+                    current_df = current_table(journal, cached["working"], section_fp, price_rows)
+                    editor_state = st.session_state.get(f"calc_editor_{safe_hole_size}_{journal['version']}") or {}
+                    step = editor_deltas(current_df, editor_state)
+                    if step:
+                        record_step(journal, step)
+                        current_df = current_table(journal, cached["working"], section_fp, price_rows)
+                    t["rows"] = len(step)
+
+                # --- Display editable table (rebuilt on the current table after each step) ---
+                with stage(timings, "render", hole_size, len(current_df)):
+                    st.data_editor(
+                        current_df,
+                        num_rows="dynamic",
+                        key=f"calc_editor_{safe_hole_size}_{journal['version']}",
                     )
-                
-                # Apply sidebar inputs and recalc
-                working_calc_df["Total Days"] = total_days
-                working_calc_df["Total Months"] = total_months
-                working_calc_df["Total Depth (ft)"] = total_depth
-                working_calc_df["Total Survey (ft)"] = total_survey
-                working_calc_df["Total Hours"] = total_hours
-                working_calc_df["Discount (%)"] = discount * 100
-                
-                working_calc_df = apply_quantities(working_calc_df, selected_well, hole_size, quantity_tools)
-                working_calc_df = recalc_costs(working_calc_df).reset_index(drop=True)
-                
-                # --- Display editable table ---
-                edited_df = st.data_editor(
-                    working_calc_df,
-                    num_rows="dynamic",
-                    key=f"calc_editor_{safe_hole_size}",
-                )
-                
-                # --- Reapply exceptions after user edits ---
-                edited_df = apply_quantities(edited_df, selected_well, hole_size, quantity_tools)
-                updated_calc_df = recalc_costs(edited_df)
+
+                # --- Identify special tools for Excel/flat charge calculations separately ---
+                if cached.get("updated") is not current_df:
+                    cached["charge_sections"] = flat_charge_sections(current_df)
+                    with stage(timings, "cost cube", hole_size, len(current_df)):
+                        cached["cube"] = build_cube(current_df, code_groups_map.get(selected_service, {}))
+                    cached["updated"] = current_df
+                updated_calc_df = current_df
                 st.session_state[calc_key] = updated_calc_df
                 
                 # --- Section total ---
@@ -501,18 +324,47 @@ if uploaded_file:
                 section_totals[hole_size] = section_total
                 st.write(f"### 💵 Section Total for {hole_size}\" Hole: {section_total:,.2f}")
 
-                # --- Identify special tools for Excel/flat charge calculations separately ---
-                flat_charge_sections = {}
-                for charge_value in updated_calc_df["Total Flat Charge"].unique():
-                    if charge_value > 0:
-                        tools = updated_calc_df.loc[
-                            updated_calc_df["Total Flat Charge"] == charge_value, "Specification 1"
-                        ].tolist()
-                        section_name = f"FlatCharge_{charge_value}"
-                        flat_charge_sections[section_name] = tools
-                
+                # --- Undo / redo and the audit trail of this section's edits ---
+                with st.expander(f"Edit history ({journal['cursor']} of {len(journal['steps'])} steps applied)"):
+                    undo_col, redo_col = st.columns(2)
+                    undo_col.button(
+                        "Undo", key=f"undo_{safe_hole_size}", disabled=journal["cursor"] == 0, on_click=undo, args=(journal,)
+                    )
+                    redo_col.button(
+                        "Redo", key=f"redo_{safe_hole_size}", disabled=journal["cursor"] == len(journal["steps"]),
+                        on_click=redo, args=(journal,),
+                    )
+                    if journal["steps"]:
+                        st.dataframe(journal_frame(journal), hide_index=True)
+
+                # --- What-if analysis: sweeps, grid and tornado from the section's cost cube (see wl_cube) ---
+                if st.checkbox("What-if analysis", key=f"whatif_{safe_hole_size}"):
+                    cube = cached["cube"]
+                    st.caption("Each point sets the input on every line, as the sidebar does; nothing is re-priced.")
+                    whatif_pct = st.slider(
+                        "Range (± % of each input, discount ± points)", 5, 100, 50, step=5, key=f"whatif_pct_{safe_hole_size}"
+                    )
+                    ranges = {param: input_range(param, section_inputs[param], whatif_pct) for param in sweep_params}
+
+                    st.markdown("**By tool group**")
+                    st.dataframe(rollup(cube).style.format("{:,.2f}"))
+
+                    sweep_param = st.selectbox("Sweep input", sweep_params, key=f"whatif_sweep_{safe_hole_size}")
+                    st.line_chart(sweep(cube, sweep_param, np.linspace(*ranges[sweep_param], 21)))
+                    grid_param = st.selectbox(
+                        "Grid against", [p for p in sweep_params if p != sweep_param], key=f"whatif_grid_{safe_hole_size}"
+                    )
+                    st.dataframe(grid(
+                        cube, sweep_param, np.linspace(*ranges[sweep_param], 5), grid_param, np.linspace(*ranges[grid_param], 5)
+                    ).style.format("{:,.2f}"))
+
+                    st.markdown("**Sensitivity of the section total**")
+                    swings = tornado(cube, ranges)
+                    st.bar_chart(swings[["Change at Low (MYR)", "Change at High (MYR)"]], horizontal=True)
+                    st.dataframe(swings.style.format("{:,.2f}"))
+
                 # Store for Excel download
-                all_calc_dfs_for_excel.append((hole_size, used_special_cases, updated_calc_df, flat_charge_sections))
+                all_calc_dfs_for_excel.append((hole_size, used_special_cases, updated_calc_df, cached["charge_sections"]))
 
 
 
@@ -522,125 +374,166 @@ if uploaded_file:
         grand_total = sum(section_totals.values())
         st.success(f"🏆 Grand Total Price (MYR): {grand_total:,.2f}")
 
+    # --- Cost uncertainty (Monte Carlo) ---
+    st.sidebar.header("Cost Uncertainty")
+    if section_totals and st.sidebar.checkbox("Show P10/P50/P90 cost ranges", key="mc_enabled"):
+        mc_dist = st.sidebar.selectbox("Distribution", distributions, key="mc_dist")
+        mc_samples = st.sidebar.number_input(
+            "Samples", min_value=1000, max_value=200000, value=10000, step=1000, key="mc_samples"
+        )
+        mc_sections = {}
+        for hole_size, _, priced_df, _ in all_calc_dfs_for_excel:
+            ranges = {}
+            with st.sidebar.expander(f"Ranges for {hole_size}\" (% of input)"):
+                for param in uncertain_params:
+                    base = section_params[hole_size][param]
+                    low_pct, high_pct = st.slider(param, -100, 200, (-10, 20), step=5, key=f"mc_{param}_{hole_size}")
+                    ranges[param] = (base * (1 + low_pct / 100), base, base * (1 + high_pct / 100))
+            mc_sections[hole_size] = (priced_df, ranges)
+
+        st.subheader("Cost Uncertainty (MYR)")
+        st.dataframe(simulate(mc_sections, n=int(mc_samples), dist=mc_dist).style.format("{:,.2f}"))
+
+    # --- Campaign mode: many wells priced against the same rate table ---
+    st.sidebar.header("Campaign")
+    campaign_file = st.sidebar.file_uploader("Campaign file (wells & sections)", type=["csv", "json", "yaml", "yml"])
+    if campaign_file:
+        # Priced lines and rollups are cached by campaign content and rate sheet; the
+        # workbook is built on request by a background job, like the estimate export
+        campaign_key = f"campaign-{rate_key}-{campaign_file.name}-{file_digest(campaign_file.getvalue())}"
+
+        def price_campaign_file():
+            rows = read_scenarios(campaign_file)
+            lines = price_campaign(df, rows)
+            return rows, lines, campaign_rollups(lines)
+
+        try:
+            with stage(timings, "campaign") as t:
+                campaign_rows, campaign_lines, campaign_tables = shared_result(campaign_key, price_campaign_file)
+                t["rows"] = len(campaign_lines)
+        except ValueError as exc:
+            st.error(str(exc))
+        else:
+            st.header(f"Campaign: {len({r.get('well') for r in campaign_rows})} well(s)")
+            for name, table in campaign_tables.items():
+                st.subheader(name)
+                st.dataframe(table.style.format("{:,.2f}"))
+
+            campaign_export_key = f"{campaign_key}-xlsx"
+            campaign_job = job_status(campaign_export_key)
+            if campaign_job is None or campaign_job["state"] == "failed":
+                if campaign_job is not None:
+                    st.error(f"Campaign export failed: {campaign_job['error']}")
+                if st.button("Prepare Campaign Excel"):
+                    campaign_job = submit_job(campaign_export_key, campaign_bytes, campaign_lines, campaign_tables)
+
+            if campaign_job is not None and campaign_job["state"] == "running":
+                @st.fragment(run_every=0.5)
+                def campaign_export_progress():
+                    job = job_status(campaign_export_key)
+                    if job is None or job["state"] != "running":
+                        st.rerun()
+                    st.progress(job["progress"], text="Building Campaign Excel...")
+
+                campaign_export_progress()
+            elif campaign_job is not None and campaign_job["state"] == "done":
+                st.download_button(
+                    "Download Campaign Excel",
+                    data=campaign_job["result"],
+                    file_name="Campaign_Estimate.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+
 # --- Excel Download ---
-# --- Excel Download ---
-# --- Excel Download ---
-if st.button("Download Cost Estimate Excel"):
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        for hole_size, used_special_cases, df_tools_section, flat_charge_sections in all_calc_dfs_for_excel:
-            sheet_name = f'{hole_size}" Hole'
-            wb = writer.book
-            ws = wb.create_sheet(title=sheet_name)
-
-            # --- Header rows ---
-            ws.merge_cells("B2:B4"); ws["B2"]="Reference"
-            ws.merge_cells("C2:C4"); ws["C2"]="Specification 1"
-            ws.merge_cells("D2:D4"); ws["D2"]="Specification 2"
-            ws.merge_cells("E2:J2"); ws["E2"]="Unit Price"
-            ws.merge_cells("E3:F3"); ws["E3"]="Rental Price"
-            ws.merge_cells("G3:J3"); ws["G3"]="Operating Charge"
-            ws["E4"]="Daily Rate"; ws["F4"]="Monthly Rate"; ws["G4"]="Depth Charge (per ft)"
-            ws["H4"]="Survey Charge (per ft)"; ws["I4"]="Flat Charge"; ws["J4"]="Hourly Charge"
-
-            ws.merge_cells("K2:Q2"); ws["K2"] = "Operation Estimated"
-            ws.merge_cells("K3:K4"); ws["K3"] = "Quantity of Tools"
-            ws.merge_cells("L3:M3"); ws["L3"] = "Rental Parameters"
-            ws["L4"] = "Total Days"; ws["M4"] = "Total Months"
-            ws.merge_cells("N3:Q3"); ws["N3"] = "Operating Parameters"
-            ws["N4"] = "Total Depth (ft)"; ws["O4"] = "Total Survey (ft)"
-            ws["P4"] = "Total Flat Charge (ft)"; ws["Q4"] = "Total Hours"
-            ws.merge_cells("R2:R4"); ws["R2"] = "Discount (%)"
-            ws.merge_cells("S2:S4"); ws["S2"] = "Total (MYR)"
-            ws.merge_cells("T2:T4"); ws["T2"] = "Grand Total Price (MYR)"
-            ws.merge_cells("U2:U3"); ws["U2"] = "Break Down"; ws["U4"] = "Rental Charge (MYR)"
-            ws.merge_cells("V2:V3"); ws["V2"] = "Break Down"; ws["V4"] = "Operating Charge (MYR)"
-
-            # --- Apply colors ---
-            white_fill = PatternFill(start_color="D9D9D9", end_color="D9D9D9", fill_type="solid")
-            light_green_fill = PatternFill(start_color="CCCC99", end_color="CCCC99", fill_type="solid")
-            blue_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            for cell in ["B2","B3","B4","C2","C3","C4","D2","D3","D4","R2","R3","R4","S2","S3","S4","T2","T3","T4","U2","U3","V2","V3"]:
-                ws[cell].fill = white_fill; ws[cell].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            for cell in ["E2","E3","E4","F2","F3","F4","G2","G3","G4","H4","I4","J4","U4","V4"]:
-                ws[cell].fill = light_green_fill; ws[cell].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-            for cell in ["K2","K3","K4","L3","L4","M3","M4","N3","N4","O4","P4","Q4"]:
-                ws[cell].fill = blue_fill; ws[cell].alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-            # --- Insert data with inline red dividers ---
-            current_row = 5
-            first_data_row = current_row
-            inserted_dividers = set()
-
-            for _, item_row in df_tools_section.iterrows():
-                # Identify special case this row belongs to
-                sc_name = None
-                for sc, items in flat_charge_sections.items():
-                    if item_row["Specification 1"] in items:
-                        sc_name = sc
-                        break
-
-                # Insert red divider only once per special case
-                if sc_name and sc_name not in inserted_dividers:
-                    ws[f"B{current_row}"] = f'{hole_size}" in Section: {sc_name}'
-                    ws[f"B{current_row}"].fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-                    ws[f"B{current_row}"].alignment = Alignment(horizontal="center")
-                    current_row += 1
-                    inserted_dividers.add(sc_name)
-
-                # Insert tool row
-                for col, val in zip(
-                    ["B","C","D","E","F","G","H","I","J"], 
-                    [item_row["Reference"], item_row["Specification 1"], item_row["Specification 2"],
-                     item_row["Daily Rate"], item_row["Monthly Rate"], item_row["Depth Charge (per ft)"],
-                     item_row["Survey Charge (per ft)"], item_row["Flat Charge"], item_row["Hourly Charge"]]
-                ):
-                    ws[f"{col}{current_row}"] = val
-
-                # Operational columns
-                ws[f"K{current_row}"] = item_row["Quantity of Tools"]
-                ws[f"L{current_row}"] = item_row["Total Days"]
-                ws[f"M{current_row}"] = item_row["Total Months"]
-                ws[f"N{current_row}"] = item_row["Total Depth (ft)"]
-                ws[f"O{current_row}"] = item_row["Total Survey (ft)"]
-                ws[f"P{current_row}"] = item_row["Total Flat Charge"]
-                ws[f"Q{current_row}"] = item_row["Total Hours"]
-                ws[f"R{current_row}"] = item_row["Discount (%)"]
-
-                # Charges
-                rental_charge = item_row["Quantity of Tools"] * (
-                    item_row["Daily Rate"] * item_row["Total Days"] +
-                    item_row["Monthly Rate"] * item_row["Total Months"]
-                ) * (1 - item_row["Discount (%)"]/100)
-
-                operating_charge = (
-                    item_row["Depth Charge (per ft)"] * item_row["Total Depth (ft)"] +
-                    item_row["Survey Charge (per ft)"] * item_row["Total Survey (ft)"] +
-                    item_row["Flat Charge"] * item_row["Total Flat Charge"] +
-                    item_row["Hourly Charge"] * item_row["Total Hours"]
-                ) * (1 - item_row["Discount (%)"]/100)
-
-                ws[f"S{current_row}"] = rental_charge + operating_charge
-                ws[f"U{current_row}"] = rental_charge
-                ws[f"V{current_row}"] = operating_charge
-
-                current_row += 1
-
-            # Grand total
-            ws[f"T{first_data_row}"] = f"=SUM(S{first_data_row}:S{current_row-1})"
-            ws[f"T{first_data_row}"].alignment = Alignment(horizontal="center")
-
-    output.seek(0)
+# Built by a background job keyed by the estimate's fingerprint (see wl_jobs), so pricing
+# reruns never wait on openpyxl and an unchanged estimate downloads straight away.
+if uploaded_file and all_calc_dfs_for_excel:
+    export_key = f"estimate-{estimate_fingerprint(all_calc_dfs_for_excel)}"
+    export_job = job_status(export_key)
+    if export_job is None or export_job["state"] == "failed":
+        if export_job is not None:
+            st.error(f"Excel export failed: {export_job['error']}")
+        if st.button("Prepare Cost Estimate Excel"):
+            export_job = submit_job(export_key, build_estimate_bytes, all_calc_dfs_for_excel)
+
+    if export_job is not None and export_job["state"] == "running":
+        @st.fragment(run_every=0.5)
+        def export_progress():
+            # Polls only this fragment; a full rerun swaps in the download button when done
+            job = job_status(export_key)
+            if job is None or job["state"] != "running":
+                st.rerun()
+            st.progress(job["progress"], text="Building Cost Estimate Excel...")
+
+        export_progress()
+    elif export_job is not None and export_job["state"] == "done":
+        timings.append({
+            "stage": "excel export (background)", "section": None,
+            "rows": sum(len(priced_df) for _, _, priced_df, _ in all_calc_dfs_for_excel), "ms": export_job["ms"],
+        })
+        st.download_button(
+            "Download Cost Estimate Excel",
+            data=export_job["result"],
+            file_name="Cost_Estimate.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+if uploaded_file and all_calc_dfs_for_excel:
+    # Saved estimate for repricing against a revised rate sheet (see wl_reprice)
+    saved_lines = estimate_lines(all_calc_dfs_for_excel, None if selected_well == "None" else selected_well)
     st.download_button(
-        "Download Cost Estimate Excel",
-        data=output,
-        file_name="Cost_Estimate.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        "Save Estimate (CSV)",
+        data=saved_lines.to_csv(index=False),
+        file_name="Cost_Estimate_lines.csv",
+        mime="text/csv"
     )
 
-
-
-
-
-
-
+# --- Estimate store: saved estimates in a local SQLite file (see wl_store) ---
+st.sidebar.header("Saved Estimates")
+if uploaded_file and all_calc_dfs_for_excel:
+    store_name = st.sidebar.text_input("Estimate name", key="store_name")
+    if st.sidebar.button("Save to store", disabled=not store_name.strip()):
+        with stage(timings, "store save") as t:
+            t["rows"] = len(saved_lines)
+            estimate_id = save_estimate(
+                saved_lines, store_name, well=None if selected_well == "None" else selected_well,
+                rate_sheet=uploaded_file.name,
+            )
+        st.sidebar.success(f"Saved estimate #{estimate_id}")
+stored = list_estimates()
+if not stored.empty:
+    stored_labels = dict(zip(stored["id"], stored["id"].astype(str) + ": " + stored["name"]))
+    chosen_ids = st.sidebar.multiselect(
+        "Load / compare", list(stored_labels), format_func=stored_labels.get, key="store_chosen"
+    )
+    if chosen_ids:
+        st.header("Saved Estimates")
+        with stage(timings, "store query") as t:
+            comparison = compare_estimates(chosen_ids)
+            t["rows"] = len(comparison)
+        st.dataframe(comparison.style.format("{:,.2f}"))
+        if len(chosen_ids) == 1:
+            st.dataframe(load_estimate(chosen_ids[0]), hide_index=True)
+
+# --- Stage timings (profiling panel) ---
+st.sidebar.header("Diagnostics")
+if uploaded_file and not sheet_report.empty:
+    with st.sidebar.expander(f"Rate sheet checks ({len(sheet_report)} issue(s))"):
+        st.caption(", ".join(f"{check}: {count}" for check, count in report_summary(sheet_report).items()))
+        st.dataframe(sheet_report, hide_index=True)
+        st.download_button(
+            "Checks (CSV)", data=sheet_report.to_csv(index=False), file_name="rate_sheet_checks.csv", mime="text/csv"
+        )
+if st.sidebar.checkbox("Show stage timings", key="show_timings") and timings:
+    timing_meta = {
+        "rate_sheet": uploaded_file.name if uploaded_file else None,
+        "recorded_at": pd.Timestamp.now().isoformat(timespec="seconds"),
+    }
+    timing_df = timings_frame(timings)
+    st.sidebar.dataframe(timing_df, hide_index=True)
+    st.sidebar.caption(f"Total: {timing_df['ms'].sum():,.1f} ms")
+    st.sidebar.download_button(
+        "Timings (JSON)", data=timings_json(timings, **timing_meta), file_name="wl_ce_timings.json", mime="application/json"
+    )
+    st.sidebar.download_button(
+        "Timings (CSV)", data=timings_csv(timings, **timing_meta), file_name="wl_ce_timings.csv", mime="text/csv"
+    )
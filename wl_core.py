@@ -0,0 +1,116 @@
+import re
+
+import numpy as np
+
+# Pricing core: section expansion, quantity overrides, flat-charge matching and
+# line pricing on plain Python values and numpy arrays. Nothing here imports
+# pandas, Streamlit or openpyxl, so scripts, workers and tests can price lines
+# at numpy's import cost; the DataFrame pipeline (wl_pricing, wl_section) is
+# built on these functions.
+
+# Columns recalc_costs coerces to numbers before pricing
+numeric_cols = [
+    "Quantity of Tools", "Total Days", "Total Months", "Total Depth (ft)",
+    "Total Survey (ft)", "Total Hours", "Discount (%)", "Daily Rate",
+    "Monthly Rate", "Depth Charge (per ft)", "Flat Charge", "Survey Charge (per ft)",
+    "Hourly Charge", "Total Flat Charge"
+]
+
+# Unit-price columns that come from the rate sheet (the rest are estimate inputs)
+rate_cols = [
+    "Daily Rate", "Monthly Rate", "Depth Charge (per ft)", "Flat Charge", "Survey Charge (per ft)", "Hourly Charge"
+]
+
+
+def expand_codes(selected_codes, special_cases):
+    """Expand selected special-case groups into their Specification 1 codes."""
+    expanded_codes = []
+    used_special_cases = []
+    for code in selected_codes:
+        if code in special_cases:
+            expanded_codes.extend(special_cases[code])
+            used_special_cases.append(code)
+        else:
+            expanded_codes.append(code)
+    return expanded_codes, used_special_cases
+
+
+def quantity_overrides(exceptions, well, hole, extra=None):
+    """{code: quantity} for one hole section: `exceptions[well][hole]`, with `extra` on top."""
+    merged = dict(exceptions.get(well, {}).get(hole, {}))
+    merged.update(extra or {})
+    return merged
+
+
+def line_quantities(specs, sidebar_qty, overrides):
+    """Quantity of Tools per line: `sidebar_qty`, or the override for lines whose code has one."""
+    specs = np.asarray(specs, dtype=object)
+    qty = np.full(len(specs), sidebar_qty, dtype=np.result_type(sidebar_qty, *overrides.values()))
+    for spec_name, override_qty in overrides.items():
+        qty[specs == spec_name] = override_qty
+    return qty
+
+
+def compile_flat_charge_groups(flat_charge_groups):
+    """Compile {charge: [spec substrings]} into an ordered list of (charge, regex).
+
+    Groups are returned last-first so the first hit reproduces the old
+    "later groups overwrite earlier ones" behaviour.
+    """
+    compiled = []
+    for charge_value, specs in flat_charge_groups.items():
+        patterns = sorted({spec.upper() for spec in specs if spec}, key=len, reverse=True)
+        if patterns:
+            compiled.append((charge_value, re.compile("|".join(map(re.escape, patterns)))))
+    return compiled[::-1]
+
+
+def flat_charge_for(spec_upper, compiled):
+    """Total Flat Charge for one upper-cased Specification 1, or None if no group matches."""
+    for charge_value, pattern in compiled:
+        if pattern.search(spec_upper):
+            return charge_value
+    return None
+
+
+def line_charges(lines):
+    """(rental, operating) charges from numeric columns given as arrays or scalars.
+
+    `lines` maps numeric_cols names to values (a dict or a DataFrame); missing
+    columns count as 0. Values must already be numbers.
+    """
+    def col(name):
+        return np.asarray(lines[name] if name in lines else 0.0, dtype=float)
+
+    disc_factor = 1 - col("Discount (%)") / 100
+    operating = (
+        col("Depth Charge (per ft)") * col("Total Depth (ft)") +
+        col("Survey Charge (per ft)") * col("Total Survey (ft)") +
+        col("Flat Charge") * col("Total Flat Charge") +
+        col("Hourly Charge") * col("Total Hours")
+    ) * disc_factor
+    rental = col("Quantity of Tools") * (
+        col("Daily Rate") * col("Total Days") +
+        col("Monthly Rate") * col("Total Months")
+    ) * disc_factor
+    return rental, operating
+
+
+def price_lines(lines, inputs=None):
+    """recalc_costs without pandas: {"Total (MYR)", "Rental Charge (MYR)", "Operating Charge (MYR)"} arrays.
+
+    `inputs` holds section-wide values (days, months, depth, ...) for columns
+    `lines` does not carry. Lines whose Specification 1 starts with "---"
+    (group dividers) are priced at 0.
+    """
+    values = dict(inputs or {})
+    values.update({name: lines[name] for name in numeric_cols if name in lines})
+    rental, operating = line_charges(values)
+    if "Specification 1" in lines:
+        specs = np.asarray(lines["Specification 1"], dtype=object)
+        n = len(specs)
+        rental, operating = np.broadcast_to(rental, n).copy(), np.broadcast_to(operating, n).copy()
+        dividers = np.fromiter((str(spec).startswith("---") for spec in specs), dtype=bool, count=n)
+        rental[dividers] = 0
+        operating[dividers] = 0
+    return {"Total (MYR)": operating + rental, "Rental Charge (MYR)": rental, "Operating Charge (MYR)": operating}
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from wl_campaign import charge_columns
+from wl_pricing import divider_mask
+from wl_section import tool_groups
+
+# What-if cost cube. recalc_costs is linear in every section input but the
+# discount, which scales a line's whole charge:
+#     line total = (1 - discount / 100) * sum over terms of coefficient * input
+# so a priced table reduces once to per-term sums by tool group, and sweeps,
+# grids, tornado charts and rollups are evaluated from those sums with numpy
+# broadcasting instead of re-running the DataFrame pipeline.
+
+# (term, section input it multiplies, charge type); the flat term is fixed
+charge_terms = [
+    ("Flat", None, "Operating"),
+    ("Depth", "Total Depth (ft)", "Operating"),
+    ("Survey", "Total Survey (ft)", "Operating"),
+    ("Hourly", "Total Hours", "Operating"),
+    ("Daily", "Total Days", "Rental"),
+    ("Monthly", "Total Months", "Rental"),
+]
+sweep_params = [col for _, col, _ in charge_terms if col] + ["Discount (%)"]
+
+
+def _col(df, col):
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def line_terms(priced_df):
+    """(coefficients, inputs, discount factors) of a priced table, one column per charge_terms entry.
+
+    coefficients * inputs is each line's undiscounted charge per term; the flat
+    term's input is 1. Divider rows have zero coefficients.
+    """
+    qty = _col(priced_df, "Quantity of Tools")
+    coef = np.column_stack([
+        _col(priced_df, "Flat Charge") * _col(priced_df, "Total Flat Charge"),
+        _col(priced_df, "Depth Charge (per ft)"),
+        _col(priced_df, "Survey Charge (per ft)"),
+        _col(priced_df, "Hourly Charge"),
+        qty * _col(priced_df, "Daily Rate"),
+        qty * _col(priced_df, "Monthly Rate"),
+    ])
+    coef[divider_mask(priced_df)] = 0
+    inputs = np.column_stack([
+        np.ones(len(priced_df)) if col is None else _col(priced_df, col) for _, col, _ in charge_terms
+    ])
+    return coef, inputs, 1 - _col(priced_df, "Discount (%)") / 100
+
+
+def build_cube(priced_df, code_groups=None):
+    """Per-term sums of a priced section table by tool group.
+
+    "at_inputs" holds each (group, term) charge at the lines' own inputs and
+    "per_unit" the charge per unit of the term's input; "gross_*" are the same
+    before discount, used when the discount itself is varied. `code_groups`
+    is the service's {code: groups} map used to label lines (see tool_groups).
+    """
+    coef, inputs, disc = line_terms(priced_df)
+    labels = tool_groups(priced_df, code_groups or {}) if len(priced_df) else pd.Series([], dtype=object)
+    index, groups = pd.factorize(labels, sort=False)
+
+    def by_group(values):
+        sums = np.zeros((len(groups), values.shape[1]))
+        np.add.at(sums, index, values)
+        return sums
+
+    return {
+        "groups": list(groups),
+        "rental": np.array([kind == "Rental" for _, _, kind in charge_terms]),
+        "at_inputs": by_group(coef * inputs * disc[:, None]),
+        "per_unit": by_group(coef * disc[:, None]),
+        "gross_at_inputs": by_group(coef * inputs),
+        "gross_per_unit": by_group(coef),
+    }
+
+
+def input_range(param, base, pct):
+    """(low, high) around `base`: ±pct percent of the input, or ±pct points for the discount (within 0-100)."""
+    if param == "Discount (%)":
+        return max(base - pct, 0.0), min(base + pct, 100.0)
+    return max(base * (1 - pct / 100), 0.0), base * (1 + pct / 100)
+
+
+def cube_charges(cube, values=None):
+    """(..., group, term) charges with `values` ({section input: number or array}) set on every line.
+
+    Inputs missing from `values` keep the lines' own values. Array values
+    broadcast against each other, so a sweep passes one array and a grid two
+    orthogonal ones.
+    """
+    values = values or {}
+    unknown = set(values) - set(sweep_params)
+    if unknown:
+        raise ValueError(f"cannot vary {', '.join(sorted(unknown))}")
+    arrays = dict(zip(values, np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in values.values()))))
+    shape = next(iter(arrays.values())).shape if arrays else ()
+
+    gross = "Discount (%)" in arrays
+    base, unit = (cube["gross_at_inputs"], cube["gross_per_unit"]) if gross else (cube["at_inputs"], cube["per_unit"])
+    charges = np.broadcast_to(base, shape + base.shape).copy()
+    for k, (_, col, _) in enumerate(charge_terms):
+        if col in arrays:
+            charges[..., k] = arrays[col][..., None] * unit[:, k]
+    if gross:
+        charges *= (1 - arrays["Discount (%)"] / 100)[..., None, None]
+    return charges
+
+
+def cube_total(cube, values=None):
+    """Section total(s) for `values`, shaped like the broadcast values."""
+    return cube_charges(cube, values).sum(axis=(-2, -1))
+
+
+def _split(charges, rental):
+    rent = charges[..., rental].sum(axis=-1)
+    operating = charges[..., ~rental].sum(axis=-1)
+    return rent, operating, rent + operating
+
+
+def rollup(cube, values=None):
+    """Rental / operating / total charge by tool group, with a "Section Total" row."""
+    table = pd.DataFrame(
+        dict(zip(charge_columns, _split(cube_charges(cube, values), cube["rental"]))),
+        index=pd.Index(cube["groups"], name="Tool Group"),
+    )
+    table.loc["Section Total"] = table.sum()
+    return table
+
+
+def sweep(cube, param, points):
+    """Rental / operating / total charge of the section at each distinct value of `param`."""
+    points = np.unique(np.asarray(points, dtype=float))
+    charges = cube_charges(cube, {param: points}).sum(axis=-2)
+    return pd.DataFrame(dict(zip(charge_columns, _split(charges, cube["rental"]))), index=pd.Index(points, name=param))
+
+
+def grid(cube, row_param, row_points, col_param, col_points):
+    """Section totals over two inputs: rows are distinct `row_param` values, columns `col_param` values."""
+    if row_param == col_param:
+        raise ValueError("choose two different inputs for a grid")
+    rows, cols = np.unique(np.asarray(row_points, dtype=float)), np.unique(np.asarray(col_points, dtype=float))
+    totals = cube_total(cube, {row_param: rows[:, None], col_param: cols[None, :]})
+    return pd.DataFrame(totals, index=pd.Index(rows, name=row_param), columns=pd.Index(cols, name=col_param))
+
+
+def tornado(cube, ranges):
+    """Sensitivity of the section total to each input over `ranges` ({input: (low, high)}), largest swing first."""
+    base = cube_total(cube)
+    rows = []
+    for param, (low, high) in ranges.items():
+        at_low, at_high = cube_total(cube, {param: [low, high]})
+        rows.append((param, low, high, at_low - base, at_high - base))
+    table = pd.DataFrame(rows, columns=["Input", "Low", "High", "Change at Low (MYR)", "Change at High (MYR)"])
+    swing = (table["Change at High (MYR)"] - table["Change at Low (MYR)"]).abs()
+    return table.assign(**{"Swing (MYR)": swing}).sort_values("Swing (MYR)", ascending=False).set_index("Input")
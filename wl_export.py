@@ -0,0 +1,174 @@
+import hashlib
+import json
+from functools import lru_cache
+from io import BytesIO
+
+import pandas as pd
+
+# Streaming (write-only) cost-estimate workbook: rows are appended once, styles are shared.
+# openpyxl is imported on the first export only, so importing this module stays cheap.
+
+# --- Header layout (rows 2-4) ---
+header_text = {
+    "B2": "Reference", "C2": "Specification 1", "D2": "Specification 2",
+    "E2": "Unit Price", "E3": "Rental Price", "G3": "Operating Charge",
+    "E4": "Daily Rate", "F4": "Monthly Rate", "G4": "Depth Charge (per ft)",
+    "H4": "Survey Charge (per ft)", "I4": "Flat Charge", "J4": "Hourly Charge",
+    "K2": "Operation Estimated", "K3": "Quantity of Tools",
+    "L3": "Rental Parameters", "L4": "Total Days", "M4": "Total Months",
+    "N3": "Operating Parameters", "N4": "Total Depth (ft)", "O4": "Total Survey (ft)",
+    "P4": "Total Flat Charge (ft)", "Q4": "Total Hours",
+    "R2": "Discount (%)", "S2": "Total (MYR)", "T2": "Grand Total Price (MYR)",
+    "U2": "Break Down", "U4": "Rental Charge (MYR)",
+    "V2": "Break Down", "V4": "Operating Charge (MYR)",
+}
+header_merges = [
+    "B2:B4", "C2:C4", "D2:D4", "E2:J2", "E3:F3", "G3:J3",
+    "K2:Q2", "K3:K4", "L3:M3", "N3:Q3", "R2:R4", "S2:S4", "T2:T4", "U2:U3", "V2:V3",
+]
+
+# --- Shared style objects (created once, by _styles) ---
+fill_colors = {"white": "D9D9D9", "light_green": "CCCC99", "blue": "4472C4", "red": "FF0000"}
+
+header_fills = {}
+for _cell in ["B2","B3","B4","C2","C3","C4","D2","D3","D4","R2","R3","R4","S2","S3","S4","T2","T3","T4","U2","U3","V2","V3"]:
+    header_fills[_cell] = "white"
+for _cell in ["E2","E3","E4","F2","F3","F4","G2","G3","G4","H4","I4","J4","U4","V4"]:
+    header_fills[_cell] = "light_green"
+for _cell in ["K2","K3","K4","L3","L4","M3","M4","N3","N4","O4","P4","Q4"]:
+    header_fills[_cell] = "blue"
+
+# Data columns B..V in sheet order; T carries the grand-total formula only
+line_columns = [
+    "Reference", "Specification 1", "Specification 2",
+    "Daily Rate", "Monthly Rate", "Depth Charge (per ft)", "Survey Charge (per ft)", "Flat Charge", "Hourly Charge",
+    "Quantity of Tools", "Total Days", "Total Months", "Total Depth (ft)", "Total Survey (ft)",
+    "Total Flat Charge", "Total Hours", "Discount (%)", "Total (MYR)",
+]
+breakdown_columns = ["Rental Charge (MYR)", "Operating Charge (MYR)"]
+first_data_row = 5
+sheet_columns = [chr(c) for c in range(ord("A"), ord("V") + 1)]
+
+
+@lru_cache(maxsize=1)
+def _styles():
+    from openpyxl.styles import Alignment, PatternFill
+
+    styles = {name: PatternFill(start_color=color, end_color=color, fill_type="solid") for name, color in fill_colors.items()}
+    styles["header"] = Alignment(horizontal="center", vertical="center", wrap_text=True)
+    styles["center"] = Alignment(horizontal="center")
+    return styles
+
+
+def _styled(ws, value, fill=None, alignment=None):
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value=value)
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
+
+
+def _write_header(ws):
+    styles = _styles()
+    ws.append([])
+    for row in (2, 3, 4):
+        cells = []
+        for col in sheet_columns:
+            ref = f"{col}{row}"
+            value = header_text.get(ref)
+            fill = header_fills.get(ref)
+            if fill is not None:
+                cells.append(_styled(ws, value, styles[fill], styles["header"]))
+            else:
+                cells.append(value)
+        ws.append(cells)
+    for cell_range in header_merges:
+        ws.merged_cells.add(cell_range)
+
+
+def _section_lookup(charge_sections):
+    # First section listing a code wins, as in the original per-row scan
+    lookup = {}
+    for sc_name, items in charge_sections.items():
+        for item in items:
+            lookup.setdefault(item, sc_name)
+    return lookup
+
+
+def cell_values(values):
+    """`values` as a row for a write-only sheet: NaN/NA are not valid cell values, so they become blanks."""
+    return [None if isinstance(v, float) and v != v or v is pd.NA else v for v in values]
+
+
+def write_section_sheet(wb, hole_size, priced_df, charge_sections):
+    """Append one '<hole>" Hole' sheet for a priced section to a write-only workbook."""
+    styles = _styles()
+    ws = wb.create_sheet(title=f'{hole_size}" Hole')
+    _write_header(ws)
+
+    specs = priced_df["Specification 1"].tolist()
+    lookup = _section_lookup(charge_sections)
+    divider_rows = len({lookup[s] for s in specs if s in lookup})
+    last_row = first_data_row + len(specs) + divider_rows - 1
+    total_cell = _styled(ws, f"=SUM(S{first_data_row}:S{last_row})", alignment=styles["center"])
+
+    lines = priced_df.reindex(columns=line_columns).itertuples(index=False, name=None)
+    breakdown = priced_df.reindex(columns=breakdown_columns).itertuples(index=False, name=None)
+
+    inserted_dividers = set()
+    first = True
+    for spec, line, (rental, operating) in zip(specs, lines, breakdown):
+        sc_name = lookup.get(spec)
+        if sc_name and sc_name not in inserted_dividers:
+            row = [None, _styled(ws, f'{hole_size}" in Section: {sc_name}', styles["red"], styles["center"])]
+            if first:
+                row += [None] * 17 + [total_cell]
+                first = False
+            ws.append(row)
+            inserted_dividers.add(sc_name)
+
+        row = [None] + cell_values(line) + [None, rental, operating]
+        if first:
+            row[19] = total_cell
+            first = False
+        ws.append(row)
+
+    if first:
+        ws.append([None] * 19 + [total_cell])
+    return ws
+
+
+def build_estimate_workbook(sections, progress=None):
+    """Return the cost-estimate .xlsx bytes for [(hole_size, used_special_cases, priced_df, charge_sections)].
+
+    `progress`, if given, is called with the fraction done after each sheet.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    steps = len(sections) + 1
+    for i, (hole_size, _used_special_cases, priced_df, charge_sections) in enumerate(sections, 1):
+        write_section_sheet(wb, hole_size, priced_df, charge_sections)
+        if progress is not None:
+            progress(i / steps)
+    output = BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def build_estimate_bytes(sections, progress=None):
+    """build_estimate_workbook as plain bytes, for background export jobs (see wl_jobs)."""
+    return build_estimate_workbook(sections, progress).getvalue()
+
+
+def estimate_fingerprint(sections):
+    """Content hash of everything the workbook is built from, used to cache export bytes."""
+    digest = hashlib.sha1()
+    for hole_size, used_special_cases, priced_df, charge_sections in sections:
+        digest.update(json.dumps([hole_size, list(used_special_cases), charge_sections, list(priced_df.columns)], default=str).encode())
+        digest.update(pd.util.hash_pandas_object(priced_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
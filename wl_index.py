@@ -0,0 +1,129 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# One-time index over the rate sheet so per-tab filtering touches only the selected rows
+
+_indexes = {}
+
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA
+
+
+def build_rate_index(df):
+    """Row positions by (Package, Service Name) and by Specification 1, plus the option lists."""
+    groups = df.groupby(["Package", "Service Name"], dropna=False, sort=False).indices
+    rows = {}
+    blank_rows = {}
+    service_opts = {}
+    # Visit groups in order of first appearance so option lists match .dropna().unique()
+    for (package, service), positions in sorted(groups.items(), key=lambda item: item[1][0]):
+        if _blank(package):
+            continue
+        options = service_opts.setdefault(package, [])
+        if _blank(service) or service == "":
+            blank_rows.setdefault(package, []).append(positions)
+            if service == "":
+                rows[(package, "")] = positions
+        else:
+            rows[(package, service)] = positions
+        if not _blank(service) and str(service).strip() != "":
+            options.append(service)
+    for options in service_opts.values():
+        if "" not in options:
+            options.append("")
+
+    codes = df.groupby("Specification 1", sort=False).indices
+    return {
+        "packages": df["Package"].dropna().unique().tolist(),
+        "services": service_opts,
+        "rows": rows,
+        "blank_rows": {pkg: np.sort(np.concatenate(parts)) for pkg, parts in blank_rows.items()},
+        "codes": codes,
+        "service_rows": {},
+        "code_lists": {},
+    }
+
+
+def decode_categories(df):
+    """`df` with categorical columns turned back into their plain value dtype.
+
+    Section tables are edited row by row, so they carry plain text rather than
+    the shared rate table's fixed category sets.
+    """
+    cat_cols = [col for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not cat_cols:
+        return df
+    df = df.copy(deep=False)
+    for col in cat_cols:
+        values = df[col].cat
+        df[col] = values.categories.take(values.codes.to_numpy(), allow_fill=True, fill_value=np.nan)
+    return df
+
+
+def rate_index(df):
+    """Index for a loaded rate sheet, built on first use and dropped with the frame."""
+    key = id(df)
+    index = _indexes.get(key)
+    if index is None:
+        index = build_rate_index(df)
+        _indexes[key] = index
+        weakref.finalize(df, _indexes.pop, key, None)
+    return index
+
+
+def service_positions(index, package, service):
+    """Sorted row positions for package rows whose Service Name is `service` or blank."""
+    key = (package, service)
+    if key not in index["service_rows"]:
+        index["service_rows"][key] = _service_positions(index, package, service)
+    return index["service_rows"][key]
+
+
+def _service_positions(index, package, service):
+    blank = index["blank_rows"].get(package)
+    exact = index["rows"].get((package, service))
+    parts = [p for p in (exact, blank) if p is not None]
+    if not parts:
+        return np.empty(0, dtype=np.intp)
+    if len(parts) == 1:
+        return parts[0]
+    return np.union1d(parts[0], parts[1])
+
+
+def list_packages(df):
+    return list(rate_index(df)["packages"])
+
+
+def list_services(df, package):
+    return list(rate_index(df)["services"].get(package, [""]))
+
+
+def select_service(df, package, service):
+    return df.iloc[service_positions(rate_index(df), package, service)]
+
+
+def service_codes(df, package, service):
+    """Distinct Specification 1 codes available for a package/service, in sheet order."""
+    index = rate_index(df)
+    key = (package, service)
+    if key not in index["code_lists"]:
+        index["code_lists"][key] = select_service(df, package, service)["Specification 1"].dropna().unique().tolist()
+    return list(index["code_lists"][key])
+
+
+def select_tools(df, package, service, codes):
+    """Rows of the package/service whose Specification 1 is in `codes`, in sheet order."""
+    index = rate_index(df)
+    hits = [index["codes"][code] for code in set(codes) if code in index["codes"]]
+    if not hits:
+        return decode_categories(df.iloc[[]])
+    # Look the code hits up in the sorted service rows: work follows the hits, not the sheet
+    found = np.sort(np.concatenate(hits))
+    positions = service_positions(index, package, service)
+    if not len(positions):
+        return decode_categories(df.iloc[[]])
+    at = np.minimum(np.searchsorted(positions, found), len(positions) - 1)
+    return decode_categories(df.iloc[found[positions[at] == found]])
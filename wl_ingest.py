@@ -0,0 +1,109 @@
+from io import BytesIO
+from operator import itemgetter
+
+import pandas as pd
+
+from wl_pricing import rate_cols
+
+# Streaming rate-sheet ingest: only the columns the estimator uses are kept,
+# and .xlsx rows are read in read-only mode and turned into typed frames chunk
+# by chunk, so memory follows the used columns rather than the workbook size.
+# CSV and Parquet price books are read directly with the same projection.
+
+text_cols = ["Package", "Service Name", "Reference", "Specification 1", "Specification 2"]
+used_cols = text_cols + rate_cols
+CHUNK_ROWS = 50000
+# Cell text read as missing, as pd.read_excel / pd.read_csv do by default
+na_strings = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+
+def sheet_format(data):
+    """"xlsx", "parquet" or "csv", from the file's leading bytes."""
+    if data[:4] == b"PK\x03\x04":
+        return "xlsx"
+    if data[:4] == b"PAR1":
+        return "parquet"
+    return "csv"
+
+
+def _chunk_frame(rows, columns):
+    frame = pd.DataFrame.from_records(rows, columns=columns)
+    for col in columns:
+        values = frame[col]
+        # All-text columns come back as the str dtype on pandas >= 3, not object
+        if values.dtype != object and not pd.api.types.is_string_dtype(values):
+            continue
+        values = values.where(values.notna() & ~values.isin(na_strings))
+        if col in text_cols:
+            values = values.where(values.isna(), values.astype(str))
+        else:
+            # Typed now when every cell parses; otherwise left for wl_normalize to report
+            parsed = pd.to_numeric(values, errors="coerce")
+            if parsed.count() == values.count():
+                values = parsed
+        frame[col] = values
+    return frame
+
+
+def _stream_xlsx(data, sheet_name):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(BytesIO(data), read_only=True, data_only=True)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"worksheet {sheet_name!r} not found; sheets: {', '.join(wb.sheetnames)}")
+        ws = wb[sheet_name]
+        header = next(ws.iter_rows(max_row=1, values_only=True), ())
+        positions = {}
+        for i, name in enumerate(header):
+            if name in used_cols and name not in positions:
+                positions[name] = i
+        if not positions:
+            return pd.DataFrame(columns=used_cols)
+        columns = list(positions)
+        pick = itemgetter(*positions.values())
+        width = max(positions.values()) + 1
+
+        # Cells right of the last used column are never materialized
+        chunks, chunk = [], []
+        for row in ws.iter_rows(min_row=2, max_col=width, values_only=True):
+            row = tuple(row) + (None,) * (width - len(row))
+            values = pick(row) if len(columns) > 1 else (pick(row),)
+            if all(v is None for v in values):
+                continue
+            chunk.append(values)
+            if len(chunk) >= CHUNK_ROWS:
+                chunks.append(_chunk_frame(chunk, columns))
+                chunk = []
+        if chunk or not chunks:
+            chunks.append(_chunk_frame(chunk, columns))
+    finally:
+        wb.close()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+
+def read_rate_sheet(data, sheet_name="Data"):
+    """Parse a rate workbook (.xlsx), CSV or Parquet price book, keeping only `used_cols`.
+
+    Missing used columns are added empty; any other columns are dropped.
+    """
+    kind = sheet_format(data)
+    if kind == "xlsx":
+        df = _stream_xlsx(data, sheet_name)
+    elif kind == "parquet":
+        import pyarrow.parquet as pq
+
+        names = pq.ParquetFile(BytesIO(data)).schema_arrow.names
+        df = pd.read_parquet(BytesIO(data), columns=[c for c in used_cols if c in names])
+        # Same missing-text rule as the spreadsheet readers
+        for col in text_cols:
+            if col in df.columns:
+                df[col] = df[col].where(~df[col].isin(na_strings))
+    else:
+        df = pd.read_csv(
+            BytesIO(data), usecols=lambda c: c in used_cols, dtype={c: str for c in text_cols}, skip_blank_lines=True
+        )
+    return df.reindex(columns=used_cols)
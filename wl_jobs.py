@@ -0,0 +1,56 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from wl_cache import lru_get, lru_put
+
+# Background jobs (e.g. Excel exports) keyed by a content fingerprint and shared
+# by every session of the process. A job is a plain dict:
+#   {"state": "running" | "done" | "failed", "progress": 0..1, "result", "error", "ms"}
+# Finished jobs stay in an LRU, so asking again for the same key is instant.
+
+MAX_JOB_WORKERS = int(os.environ.get("WL_CE_JOB_WORKERS", 2))
+MAX_JOBS = int(os.environ.get("WL_CE_JOB_RESULTS", 32))
+
+_jobs = OrderedDict()
+_lock = threading.Lock()
+_executor = None
+
+
+def _run(job, fn, args):
+    start = time.perf_counter()
+    try:
+        job["result"] = fn(*args, progress=lambda done: job.update(progress=done))
+        job["progress"] = 1.0
+        job["state"] = "done"
+    except Exception as exc:
+        job["error"] = f"{type(exc).__name__}: {exc}"
+        job["state"] = "failed"
+    finally:
+        job["ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def submit_job(key, fn, *args):
+    """Run fn(*args, progress=callback) in the background unless a live job for `key` exists.
+
+    Returns the job dict; a failed job is replaced by a fresh attempt.
+    """
+    global _executor
+    with _lock:
+        job = lru_get(_jobs, key)
+        if job is not None and job["state"] != "failed":
+            return job
+        job = {"state": "running", "progress": 0.0, "result": None, "error": None, "ms": None}
+        lru_put(_jobs, key, job, MAX_JOBS)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_JOB_WORKERS, thread_name_prefix="wl_job")
+        _executor.submit(_run, job, fn, args)
+    return job
+
+
+def job_status(key):
+    """The job dict for `key`, or None if no job was submitted (or it was evicted)."""
+    with _lock:
+        return lru_get(_jobs, key)
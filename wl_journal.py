@@ -0,0 +1,178 @@
+import math
+
+import pandas as pd
+
+from wl_core import numeric_cols
+
+# Edit journal for a priced section table. Each rerun's data_editor changes are
+# recorded as one step of compact deltas against the table the editor showed:
+#   ("edit", row, column, old, new) / ("delete", row, {column: old}) / ("add", {column: new})
+# The current table is the base with steps[:cursor] applied; applying a step only
+# reprices the rows it adds or edits, and undo/redo just move the cursor, so no
+# full snapshots are kept beyond the current table itself.
+#
+# Deltas address rows by position, so a journal belongs to one row set (the
+# section's sheet, package, service and tools): changing the section inputs
+# replays it on the repriced base, changing the rows starts a new journal.
+
+# Columns recalc_costs writes or coerces, copied back for repriced rows
+priced_cols = numeric_cols + ["Total (MYR)", "Rental Charge (MYR)", "Operating Charge (MYR)"]
+journal_cols = ["Step", "Action", "Row", "Column", "Old", "New", "Undone"]
+
+
+def new_journal(rows_key=None, version=0):
+    """Empty journal for the row set `rows_key`; `version` changes whenever the editor must be rebuilt."""
+    return {"rows": rows_key, "steps": [], "cursor": 0, "version": version, "memo": None}
+
+
+def section_journal(journals, name, rows_key):
+    """`journals[name]`, replaced by a new journal when the section's row set is no longer `rows_key`.
+
+    The new journal continues the old version so the editor is rebuilt rather
+    than handed the previous table's edits.
+    """
+    journal = journals.get(name)
+    if journal is None or journal.get("rows") != rows_key:
+        journal = journals[name] = new_journal(rows_key, journal["version"] + 1 if journal else 0)
+    return journal
+
+
+def _plain(value):
+    if hasattr(value, "item"):
+        value = value.item()
+    if value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def editor_deltas(table, editor_state):
+    """One step of deltas from a data_editor state ({edited_rows, deleted_rows, added_rows}) on `table`."""
+    step = []
+    columns = table.columns
+    for row, changes in editor_state.get("edited_rows", {}).items():
+        row = int(row)
+        for col, new in changes.items():
+            if col in columns and row < len(table):
+                old = _plain(table.iat[row, columns.get_loc(col)])
+                if old != new:
+                    step.append(("edit", row, col, old, new))
+    for row in sorted(int(row) for row in editor_state.get("deleted_rows", [])):
+        if row < len(table):
+            step.append(("delete", row, {col: _plain(value) for col, value in table.iloc[row].items()}))
+    for values in editor_state.get("added_rows", []):
+        step.append(("add", {col: value for col, value in values.items() if col in columns}))
+    return step
+
+
+def _set_cells(table, col, rows, values):
+    column = table[col].copy()
+    try:
+        column.iloc[rows] = values
+    except (TypeError, ValueError):
+        # Value of another type than the column (e.g. text in a number column)
+        column = column.astype(object)
+        column.iloc[rows] = values
+    table[col] = column
+
+
+def apply_step(table, step, price_rows):
+    """`table` with one step applied, as a new frame; untouched columns are shared with `table`.
+
+    Edits, then deletions, then additions, as the data editor applies them.
+    `price_rows(frame)` reprices a frame of the edited and added rows. Deltas
+    that point outside the table (replayed on a different base) are skipped.
+    """
+    table = table.copy(deep=False)
+    edits = {}
+    for delta in step:
+        if delta[0] == "edit" and delta[2] in table.columns and delta[1] < len(table):
+            edits.setdefault(delta[2], {})[delta[1]] = delta[4]
+    for col, cells in edits.items():
+        _set_cells(table, col, list(cells), list(cells.values()))
+    touched = sorted({row for cells in edits.values() for row in cells})
+
+    deleted = sorted({delta[1] for delta in step if delta[0] == "delete" and delta[1] < len(table)})
+    if deleted:
+        dropped = set(deleted)
+        keep = [row for row in range(len(table)) if row not in dropped]
+        position = {row: i for i, row in enumerate(keep)}
+        table = table.iloc[keep].reset_index(drop=True)
+        touched = [position[row] for row in touched if row in position]
+
+    added = [delta[1] for delta in step if delta[0] == "add"]
+    if added:
+        start = len(table)
+        table = pd.concat([table, pd.DataFrame(added).reindex(columns=table.columns)], ignore_index=True)
+        touched += list(range(start, len(table)))
+
+    if touched:
+        priced = price_rows(table.iloc[touched].reset_index(drop=True))
+        for col in priced_cols:
+            if col in priced.columns:
+                _set_cells(table, col, touched, priced[col].tolist())
+    return table
+
+
+def record_step(journal, step):
+    """Append a step at the cursor (dropping any redo tail) and ask for a fresh editor."""
+    if step:
+        if journal["memo"] is not None and journal["memo"][1] > journal["cursor"]:
+            journal["memo"] = None  # memoized table includes steps being dropped
+        del journal["steps"][journal["cursor"]:]
+        journal["steps"].append(step)
+        journal["cursor"] += 1
+        journal["version"] += 1
+    return journal
+
+
+def undo(journal):
+    if journal["cursor"] > 0:
+        journal["cursor"] -= 1
+        journal["version"] += 1
+
+
+def redo(journal):
+    if journal["cursor"] < len(journal["steps"]):
+        journal["cursor"] += 1
+        journal["version"] += 1
+
+
+def current_table(journal, base, base_key, price_rows):
+    """The base table with the journal's steps up to the cursor applied.
+
+    The last result is memoized on the journal under (base_key, cursor): moving
+    one step forward applies only that step, anything else replays from `base`.
+    """
+    memo = journal["memo"]
+    cursor = journal["cursor"]
+    if memo is not None and memo[0] == base_key:
+        if memo[1] == cursor:
+            return memo[2]
+        if memo[1] == cursor - 1:
+            table = apply_step(memo[2], journal["steps"][cursor - 1], price_rows)
+            journal["memo"] = (base_key, cursor, table)
+            return table
+    table = base
+    for step in journal["steps"][:cursor]:
+        table = apply_step(table, step, price_rows)
+    journal["memo"] = (base_key, cursor, table)
+    return table
+
+
+def journal_frame(journal):
+    """One row per delta, for the audit view; steps past the cursor are marked undone."""
+    rows = []
+    for number, step in enumerate(journal["steps"], 1):
+        undone = number > journal["cursor"]
+        for delta in step:
+            if delta[0] == "edit":
+                rows.append((number, "edit", delta[1], delta[2], delta[3], delta[4], undone))
+            elif delta[0] == "delete":
+                rows.append((number, "delete", delta[1], "Specification 1", delta[2].get("Specification 1"), None, undone))
+            else:
+                rows.append((number, "add", None, "Specification 1", None, delta[1].get("Specification 1"), undone))
+    frame = pd.DataFrame(rows, columns=journal_cols)
+    frame["Row"] = frame["Row"].astype("Int64")
+    for col in ("Old", "New"):
+        frame[col] = frame[col].map(lambda v: "" if v is None else str(v))
+    return frame
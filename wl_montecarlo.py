@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from wl_cube import line_terms
+
+# Monte Carlo cost ranges. The recalc_costs formula is linear in the section
+# inputs, so each priced table reduces to one coefficient per uncertain input
+# (see wl_cube) and all samples are priced as vector operations.
+
+uncertain_params = ["Total Depth (ft)", "Total Survey (ft)", "Total Hours", "Total Days", "Total Months"]
+distributions = ["Triangular", "Uniform", "Normal"]
+
+
+def _col(df, col):
+    return pd.to_numeric(df[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def line_coefficients(priced_df):
+    """(lines, 1 + len(uncertain_params)) matrix: fixed term, then MYR per unit of each input."""
+    coef, _, disc_factor = line_terms(priced_df)
+    return coef * disc_factor[:, None]
+
+
+def sample_param(rng, dist, low, mode, high, n):
+    """n non-negative samples; low/high are the P0/P100 (P10/P90 for Normal) bounds."""
+    low, high = min(low, high), max(low, high)
+    mode = min(max(mode, low), high)
+    if high == low:
+        return np.full(n, float(mode))
+    if dist == "Uniform":
+        samples = rng.uniform(low, high, n)
+    elif dist == "Normal":
+        samples = rng.normal(mode, (high - low) / (2 * 1.2816), n)
+    else:
+        samples = rng.triangular(low, mode, high, n)
+    return np.clip(samples, 0, None)
+
+
+def simulate_section(priced_df, ranges, n=10000, dist="Triangular", rng=None):
+    """Sampled section totals.
+
+    `ranges` maps each uncertain input to (low, most likely, high); inputs that
+    are missing keep the value already on the priced lines.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    coef = line_coefficients(priced_df)
+    fixed = coef[:, 0].sum()
+    totals = np.zeros(n)
+    for i, param in enumerate(uncertain_params, start=1):
+        if param in ranges:
+            # Sampled inputs apply to every line, so the lines collapse to one coefficient
+            totals += sample_param(rng, dist, *ranges[param], n) * coef[:, i].sum()
+        else:
+            fixed += coef[:, i] @ _col(priced_df, param)
+    return totals + fixed
+
+
+def simulate(sections, n=10000, dist="Triangular", seed=None, percentiles=(10, 50, 90)):
+    """P-values per section and for the grand total.
+
+    `sections` is {hole_size: (priced_df, ranges)}; returns a DataFrame indexed by
+    section (plus "Grand Total") with one column per percentile.
+    """
+    rng = np.random.default_rng(seed)
+    totals = {hole: simulate_section(df, ranges, n, dist, rng) for hole, (df, ranges) in sections.items()}
+    if totals:
+        totals["Grand Total"] = np.sum(list(totals.values()), axis=0)
+    rows = {name: np.percentile(values, percentiles) for name, values in totals.items()}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=[f"P{p}" for p in percentiles])
@@ -0,0 +1,118 @@
+import pandas as pd
+
+from wl_catalog import catalog
+from wl_pricing import rate_cols
+
+# One-time cleanup of a freshly parsed rate sheet, run at load (see wl_cache) so
+# the per-rerun pipeline can rely on numeric rates and trimmed, canonical codes
+# without coercing anything itself.
+
+text_cols = ["Package", "Service Name", "Specification 1"]
+key_cols = ["Package", "Service Name", "Specification 1"]
+report_cols = ["Check", "Package", "Service Name", "Specification 1", "Column", "Value"]
+
+
+def canonical_codes():
+    """{upper-cased code: catalog spelling} for every code the catalog refers to."""
+    codes = set()
+    for groups in catalog["special_cases"].values():
+        for group_codes in groups.values():
+            codes.update(group_codes)
+    for holes in catalog["quantity_exceptions"].values():
+        for exceptions in holes.values():
+            codes.update(exceptions)
+    return {code.strip().upper(): code.strip() for code in codes}
+
+
+def _strip(values):
+    if pd.api.types.infer_dtype(values, skipna=True) == "string":
+        return values.str.strip()
+    return values.map(lambda v: v.strip() if isinstance(v, str) else v)
+
+
+def _issue(check, rows, column=None, value=None):
+    report = rows.reindex(columns=key_cols).copy()
+    report.insert(0, "Check", check)
+    report["Column"] = column
+    report["Value"] = value
+    return report
+
+
+def normalize_rate_sheet(df):
+    """Return (normalized sheet, validation report) for a parsed rate sheet.
+
+    Package, Service Name and Specification 1 are trimmed, codes that differ
+    from a catalog code only by case are rewritten to the catalog spelling, and
+    every rate column becomes numeric with unparseable or blank cells as 0. The
+    report has one row per issue: unparseable rates, rewritten codes, duplicate
+    codes, catalog codes missing from the sheet and blank service names.
+    """
+    df = df.copy()
+    issues = []
+
+    for col in text_cols:
+        if col in df.columns:
+            df[col] = _strip(df[col])
+
+    # --- Canonical codes: rewrite case variants of catalog codes once, on the unique values ---
+    if "Specification 1" in df.columns:
+        canonical = canonical_codes()
+        spec = df["Specification 1"]
+        rewrites = {}
+        for code in spec.dropna().unique():
+            if isinstance(code, str) and canonical.get(code.upper(), code) != code:
+                rewrites[code] = canonical[code.upper()]
+        if rewrites:
+            changed = spec.isin(list(rewrites))
+            rows = df[changed].assign(**{"Specification 1": spec[changed].map(rewrites)})
+            issues.append(_issue("Code normalized", rows, "Specification 1", spec[changed].to_numpy()))
+            df["Specification 1"] = spec.replace(rewrites)
+
+    # --- Rates: float, unparseable cells reported and priced as 0 ---
+    for col in rate_cols:
+        if col not in df.columns:
+            df[col] = 0.0
+            continue
+        raw = df[col]
+        parsed = pd.to_numeric(raw, errors="coerce")
+        suspect = raw[parsed.isna() & raw.notna()].astype(str)
+        bad = suspect.index[suspect.str.strip() != ""]
+        if len(bad):
+            issues.append(_issue("Unparseable rate", df.loc[bad], col, suspect[bad].to_numpy()))
+        df[col] = parsed.fillna(0)
+
+    if all(col in df.columns for col in key_cols):
+        # --- Duplicate codes within a package/service ---
+        priced = df[df["Specification 1"].notna()]
+        counts = priced.groupby(key_cols, dropna=False, sort=False).size()
+        duplicates = counts[counts > 1].reset_index(name="rows")
+        if not duplicates.empty:
+            issues.append(_issue("Duplicate code", duplicates, None, duplicates["rows"].astype(str).to_numpy()))
+
+        # --- Catalog codes the sheet does not offer for their service ---
+        service = df["Service Name"]
+        blank = service.isna() | (service == "")
+        for service_name, groups in catalog["special_cases"].items():
+            offered = set(df.loc[blank | (service == service_name), "Specification 1"].dropna())
+            missing = list(dict.fromkeys(
+                (group, code) for group, codes in groups.items() for code in codes if code not in offered
+            ))
+            if missing:
+                rows = pd.DataFrame({"Service Name": service_name, "Specification 1": [code for _, code in missing]})
+                issues.append(_issue("Catalog code missing", rows, None, [group for group, _ in missing]))
+
+        # --- Blank service names: these rows are offered under every service of their package ---
+        blank_counts = df[blank & df["Package"].notna()].groupby("Package", sort=False).size()
+        if not blank_counts.empty:
+            rows = blank_counts.reset_index(name="rows")
+            issues.append(_issue("Blank service name", rows, "Service Name", (rows["rows"].astype(str) + " row(s)").to_numpy()))
+
+    report = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=report_cols)
+    report = report[report_cols]
+    report["Value"] = report["Value"].astype(str)
+    return df, report
+
+
+def report_summary(report):
+    """Issue counts per check, for a one-line status."""
+    return report["Check"].value_counts(sort=False).to_dict()
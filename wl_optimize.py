@@ -0,0 +1,352 @@
+import argparse
+import bisect
+import itertools
+import math
+
+import numpy as np
+
+from wl_catalog import special_cases_map, special_codes_map
+from wl_index import select_tools, service_codes
+from wl_pricing import price_arrays
+from wl_section import apply_quantities, build_calc_table
+
+# Tool-group selection search. Every candidate (a special-case group or a single
+# code outside the groups) is priced once for the section's inputs into a cost
+# vector plus a coverage bitmask over the service's codes; the searches below
+# work on those numbers only and never re-price a DataFrame.
+#
+# Section totals are additive over the selection: a group's lines are its codes'
+# lines (repeated per listing, as build_display_table does) and quantities and
+# flat charges depend on the code alone, so candidate costs sum exactly.
+
+MAX_NODES = 200000
+
+
+def code_costs(df, package, service, inputs, well=None, hole=None, overrides=None):
+    """{Specification 1: total of its lines} for every code of the package/service, priced in one pass."""
+    codes = service_codes(df, package, service)
+    tools = select_tools(df, package, service, codes)
+    if tools.empty:
+        return {}
+    calc_df = build_calc_table(tools, inputs)
+    calc_df = apply_quantities(calc_df, well, hole, inputs.get("Quantity of Tools", 0), overrides)
+    rental, operating = price_arrays(calc_df)
+    totals = calc_df[["Specification 1"]].assign(total=rental + operating)
+    return totals.groupby("Specification 1", sort=False)["total"].sum().to_dict()
+
+
+def build_candidates(df, package, service, inputs, well=None, hole=None, overrides=None):
+    """Priced candidates for a section: names, kinds, cost vector and coverage bitmasks.
+
+    Groups come first in catalog order, then the codes outside every group in
+    sheet order, matching the app's tool multiselect. Groups none of whose
+    codes the sheet offers are left out.
+    """
+    costs = code_costs(df, package, service, inputs, well, hole, overrides)
+    bits = {code: 1 << i for i, code in enumerate(costs)}
+    special_codes = special_codes_map.get(service, frozenset())
+
+    names, kinds, cost, masks = [], [], [], []
+    for group, codes in special_cases_map.get(service, {}).items():
+        present = [code for code in codes if code in costs]
+        if present:
+            names.append(group)
+            kinds.append("group")
+            cost.append(sum(costs[code] for code in present))
+            masks.append(sum(bits[code] for code in dict.fromkeys(present)))
+    for code in costs:
+        if code not in special_codes:
+            names.append(code)
+            kinds.append("code")
+            cost.append(costs[code])
+            masks.append(bits[code])
+    return {
+        "names": names,
+        "kinds": kinds,
+        "cost": np.asarray(cost, dtype=float),
+        "masks": masks,
+        "codes": list(costs),
+        "bits": bits,
+    }
+
+
+def _codes_mask(candidates, codes):
+    bits = candidates["bits"]
+    return sum(bits[code] for code in dict.fromkeys(codes) if code in bits)
+
+
+def _count(mask):
+    return 1 if mask and not mask & (mask - 1) else bin(mask).count("1")
+
+
+def _bits(mask):
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+def _result(candidates, chosen, wanted, nodes, exhaustive):
+    chosen = sorted(chosen)
+    union = 0
+    for i in chosen:
+        union |= candidates["masks"][i]
+    bits = candidates["bits"]
+    return {
+        "selection": [candidates["names"][i] for i in chosen],
+        "cost": float(candidates["cost"][chosen].sum()) if chosen else 0.0,
+        "covered": [code for code in candidates["codes"] if union & bits[code]],
+        "missing": [code for code in dict.fromkeys(wanted) if not union & bits.get(code, 0)],
+        "nodes": nodes,
+        "exhaustive": exhaustive,
+    }
+
+
+def cheapest_cover(candidates, required, budget=None, max_nodes=MAX_NODES):
+    """Cheapest selection covering every required code, or None if none fits `budget`.
+
+    Codes only one candidate offers force that candidate. The rest is searched
+    depth-first over the uncovered code with the fewest covering candidates,
+    cheapest candidate first, pruned by the best cost so far plus a lower bound
+    (the dearest of the cheapest ways to cover each remaining code). Required
+    codes no candidate offers are reported under "missing".
+    """
+    masks, cost = candidates["masks"], candidates["cost"]
+    need = _codes_mask(candidates, required)
+    covering = {}
+    for i, mask in enumerate(masks):
+        for bit in _bits(mask & need):
+            covering.setdefault(bit, []).append(i)
+
+    forced = list(dict.fromkeys(options[0] for options in covering.values() if len(options) == 1))
+    uncovered = sum(covering)
+    for i in forced:
+        uncovered &= ~masks[i]
+    covering = {bit: sorted(options, key=lambda i: cost[i]) for bit, options in covering.items() if uncovered & bit}
+    cheapest = {bit: cost[options[0]] for bit, options in covering.items()}
+
+    limit = math.inf if budget is None else budget
+    best = {"cost": math.inf, "chosen": None}
+    nodes = 0
+    stack = [(uncovered, float(cost[forced].sum()) if forced else 0.0, tuple(forced))]
+    while stack and nodes < max_nodes:
+        uncovered, spent, chosen = stack.pop()
+        nodes += 1
+        if spent > limit or spent >= best["cost"]:
+            continue
+        if not uncovered:
+            best["cost"], best["chosen"] = spent, chosen
+            continue
+        remaining = [bit for bit in covering if uncovered & bit]
+        if spent + max(cheapest[bit] for bit in remaining) >= best["cost"]:
+            continue
+        bit = min(remaining, key=lambda b: len(covering[b]))
+        # Pushed dearest first so the cheapest candidate is explored first
+        for i in reversed(covering[bit]):
+            total = spent + cost[i]
+            if total <= limit and total < best["cost"]:
+                stack.append((uncovered & ~masks[i], total, chosen + (i,)))
+
+    if best["chosen"] is None:
+        return None
+    return _result(candidates, best["chosen"], required, nodes, not stack)
+
+
+def _undominated(useful, masks, cost, want):
+    """`useful` without candidates whose wanted codes a no-dearer candidate also covers (lower index wins ties).
+
+    A dominating candidate must cover the dominated one's lowest wanted code,
+    so each candidate is only compared with the candidates covering that code.
+    """
+    by_bit = {}
+    for j in useful:
+        for bit in _bits(masks[j] & want):
+            by_bit.setdefault(bit, []).append(j)
+    kept = []
+    for i in useful:
+        own = masks[i] & want
+        if not any(
+            j != i and own & ~masks[j] == 0 and (cost[j] < cost[i] or (cost[j] == cost[i] and j < i))
+            for j in by_bit[own & -own]
+        ):
+            kept.append(i)
+    return kept
+
+
+def best_coverage(candidates, budget, wanted=None, max_nodes=MAX_NODES):
+    """Selection within `budget` covering the most `wanted` codes (all codes by default), cheapest on ties.
+
+    Candidates adding one wanted code no other candidate covers (in practice
+    the codes outside every group) are "singles": for any budget left, taking
+    the cheapest singles first is optimal, so they are never branched on. An
+    include/exclude branch and bound runs over the other candidates only,
+    starting from a greedy selection and cut by a fractional-knapsack bound on
+    the candidates' marginal coverage (singles included).
+    """
+    masks, cost = candidates["masks"], candidates["cost"]
+    wanted = candidates["codes"] if wanted is None else wanted
+    want = _codes_mask(candidates, wanted)
+
+    # Free candidates are always taken; ones adding nothing wanted, or dominated
+    # by a no-dearer candidate covering at least as much, are never taken
+    free = [i for i, m in enumerate(masks) if m & want and cost[i] <= 0]
+    base = 0
+    for i in free:
+        base |= masks[i] & want
+    want_left = want & ~base
+    useful = [i for i, m in enumerate(masks) if m & want_left and 0 < cost[i] <= budget]
+    kept = _undominated(useful, masks, cost, want_left)
+
+    coverers = {}
+    for i in kept:
+        for bit in _bits(masks[i] & want_left):
+            coverers[bit] = coverers.get(bit, 0) + 1
+    singles = sorted(
+        (i for i in kept if _count(masks[i] & want_left) == 1 and coverers[masks[i] & want_left] == 1),
+        key=lambda i: cost[i],
+    )
+    single_cost = [cost[i] for i in singles]
+    prefix = [0.0, *itertools.accumulate(single_cost)]
+    single_set = set(singles)
+    groups = [i for i in kept if i not in single_set]
+    order = sorted(groups, key=lambda i: _count(masks[i] & want_left) / cost[i], reverse=True)
+    n = len(order)
+
+    def take_singles(first, last, left):
+        """Singles first..last-1 bought cheapest first with `left`: (next single, budget left, codes, fraction)."""
+        stop = min(last, bisect.bisect_right(prefix, prefix[first] + left) - 1)
+        left -= prefix[stop] - prefix[first]
+        fraction = left / single_cost[stop] if stop < last else 0.0
+        return stop, left, stop - first, fraction
+
+    def bound(k, covered, spent):
+        """Upper bound on wanted codes covered below this node: fractional knapsack over marginal gains."""
+        items = []
+        for i in order[k:]:
+            gain = _count(masks[i] & want_left & ~covered)
+            if gain:
+                items.append((gain / cost[i], gain, cost[i]))
+        items.sort(reverse=True)
+        value = _count(covered & want)
+        left = budget - spent
+        s = 0
+        for _, gain, price in items:
+            # Singles at least as good per MYR as this candidate come first
+            s, left, codes, fraction = take_singles(s, bisect.bisect_right(single_cost, price / gain), left)
+            value += codes
+            if fraction:
+                return value + fraction
+            if price > left:
+                return value + gain * left / price
+            value += gain
+            left -= price
+        _, _, codes, fraction = take_singles(s, len(singles), left)
+        return value + codes + fraction
+
+    best = {"count": -1, "cost": math.inf, "chosen": ()}
+
+    def consider(covered, spent, chosen):
+        k = bisect.bisect_right(prefix, budget - spent) - 1
+        count = _count(covered & want) + k
+        total = spent + prefix[k]
+        if count > best["count"] or (count == best["count"] and total < best["cost"]):
+            best["count"], best["cost"], best["chosen"] = count, total, chosen + tuple(singles[:k])
+
+    # Greedy incumbent: repeatedly add the candidate with the best marginal coverage per MYR
+    covered, spent, chosen = base, 0.0, ()
+    consider(covered, spent, chosen)
+    while True:
+        fits = [
+            (_count(masks[i] & want_left & ~covered) / cost[i], -i)
+            for i in order if spent + cost[i] <= budget and masks[i] & want_left & ~covered
+        ]
+        if not fits:
+            break
+        i = -max(fits)[1]
+        covered, spent, chosen = covered | masks[i], spent + cost[i], chosen + (i,)
+        consider(covered, spent, chosen)
+
+    nodes = 0
+    stack = [(0, base, 0.0, ())]
+    while stack and nodes < max_nodes:
+        k, covered, spent, chosen = stack.pop()
+        nodes += 1
+        consider(covered, spent, chosen)
+        if k == n:
+            continue
+        upper = math.floor(bound(k, covered, spent) + 1e-9)
+        if upper < best["count"] or (upper == best["count"] and spent >= best["cost"]):
+            continue
+        i = order[k]
+        stack.append((k + 1, covered, spent, chosen))
+        if spent + cost[i] <= budget and masks[i] & want_left & ~covered:
+            stack.append((k + 1, covered | masks[i], spent + cost[i], chosen + (i,)))
+
+    return _result(candidates, free + list(best["chosen"]), wanted, nodes, not stack)
+
+
+def optimize_selection(
+    df, package, service, inputs, well=None, hole=None, budget=None, required=(), wanted=None, overrides=None
+):
+    """Best tool selection for one hole section, or None when nothing fits.
+
+    With `required` codes: the cheapest selection covering them (within
+    `budget` if given). With only a `budget`: the selection covering the most
+    `wanted` codes within it. Returns {"selection", "cost", "covered",
+    "missing", "nodes", "exhaustive"}; "selection" holds group names and codes
+    as the app's tool multiselect takes them. `overrides` is passed on to
+    apply_quantities.
+    """
+    if not required and budget is None:
+        raise ValueError("give a budget, required codes, or both")
+    candidates = build_candidates(df, package, service, inputs, well, hole, overrides)
+    if required:
+        return cheapest_cover(candidates, required, budget)
+    return best_coverage(candidates, budget, wanted)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the cheapest or best-covering tool selection for a hole section.")
+    parser.add_argument("rates", help="rate workbook (.xlsx) or CSV/Parquet price book")
+    parser.add_argument("--package", required=True)
+    parser.add_argument("--service", default="")
+    parser.add_argument("--budget", type=float, help="cost cap (MYR)")
+    parser.add_argument("--require", nargs="+", default=[], help="Specification 1 codes that must be covered")
+    parser.add_argument("--well", help="well name for quantity exceptions")
+    parser.add_argument("--hole", help="hole section for quantity exceptions")
+    parser.add_argument("--qty", type=float, default=2)
+    parser.add_argument("--days", type=float, default=0)
+    parser.add_argument("--months", type=float, default=1)
+    parser.add_argument("--depth", type=float, default=5500)
+    parser.add_argument("--survey", type=float, default=0)
+    parser.add_argument("--hours", type=float, default=0)
+    parser.add_argument("--discount", type=float, default=0, help="discount (%%)")
+    parser.add_argument("--sheet", default="Data", help="rate sheet name")
+    args = parser.parse_args(argv)
+    if args.budget is None and not args.require:
+        parser.error("give --budget, --require, or both")
+
+    from wl_cache import load_rate_sheet
+
+    df = load_rate_sheet(args.rates, sheet_name=args.sheet)
+    inputs = {
+        "Quantity of Tools": args.qty, "Total Days": args.days, "Total Months": args.months,
+        "Total Depth (ft)": args.depth, "Total Survey (ft)": args.survey, "Total Hours": args.hours,
+        "Discount (%)": args.discount,
+    }
+    result = optimize_selection(
+        df, args.package, args.service, inputs, args.well, args.hole, budget=args.budget, required=args.require
+    )
+    if result is None:
+        print("No selection fits the budget.")
+        return
+    for name in result["selection"]:
+        print(name)
+    search = "exhaustive" if result["exhaustive"] else "stopped at node limit"
+    print(f"Cost (MYR): {result['cost']:,.2f}; {len(result['covered'])} code(s) covered; {result['nodes']} node(s), {search}")
+    if args.require and result["missing"]:
+        print(f"Not offered by the sheet: {', '.join(result['missing'])}")
+
+
+if __name__ == "__main__":
+    main()
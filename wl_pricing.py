@@ -0,0 +1,76 @@
+import pandas as pd
+
+from wl_core import flat_charge_for, line_charges, numeric_cols, rate_cols
+
+# DataFrame side of the pricing core (wl_core): coercion of edited cells, and
+# the section-table pricing the app, batch CLI and export share
+
+
+def divider_mask(df):
+    # Divider rows carry "--- group ---" in Specification 1 and are never priced
+    return df["Specification 1"].astype(str).str.startswith("---").to_numpy()
+
+
+def _col(df, col):
+    values = df[col]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors="coerce")
+    return values.to_numpy(dtype=float, na_value=0.0)
+
+
+def _clean_numeric(values):
+    """`values` as numbers with blanks as 0; clean numeric columns are returned untouched."""
+    if pd.api.types.is_numeric_dtype(values) and not values.hasnans:
+        return values
+    return pd.to_numeric(values, errors="coerce").fillna(0)
+
+
+def price_arrays(df):
+    """Return (rental, operating) charge arrays for every row of df, dividers priced at 0."""
+    rental, operating = line_charges({col: _col(df, col) for col in numeric_cols})
+    dividers = divider_mask(df)
+    rental[dividers] = 0
+    operating[dividers] = 0
+    return rental, operating
+
+
+def recalc_costs(df):
+    """Price every line of a section table as column operations.
+
+    Adds "Total (MYR)" plus the "Rental Charge (MYR)" / "Operating Charge (MYR)"
+    breakdown used by the Excel export. Only whole columns are replaced, so the
+    result shares the untouched columns with `df` instead of copying them.
+    """
+    df = df.copy(deep=False)
+    for col in numeric_cols:
+        if col not in df.columns:
+            df[col] = 0
+            continue
+        # Sheets are normalized at load (wl_normalize), so only edited cells ever need coercion
+        values = df[col]
+        cleaned = _clean_numeric(values)
+        if cleaned is not values:
+            df[col] = cleaned
+
+    rental, operating = price_arrays(df)
+    df["Total (MYR)"] = operating + rental
+    df["Rental Charge (MYR)"] = rental
+    df["Operating Charge (MYR)"] = operating
+    return df
+
+
+def assign_flat_charges(specs, compiled, current=0, known=None):
+    """Total Flat Charge for each Specification 1 value; unmatched rows keep `current`.
+
+    `known` is an optional precomputed {upper-cased spec: charge or None} lookup.
+    """
+    upper = specs.astype("object").where(specs.notna()).str.upper()
+    lookup = dict(known) if known else {}
+    for spec in upper.dropna().unique():
+        if spec not in lookup:
+            lookup[spec] = flat_charge_for(spec, compiled)
+    lookup = {spec: charge for spec, charge in lookup.items() if charge is not None}
+    result = pd.Series(current, index=specs.index)
+    matched = upper.isin(lookup.keys()).to_numpy()
+    result[matched] = upper[matched].map(lookup)
+    return result
@@ -0,0 +1,186 @@
+"""Reprice saved estimates against a revised rate sheet.
+
+    python wl_reprice.py old_rates.xlsx new_rates.xlsx estimate1.csv [estimate2.csv ...] -o deltas.xlsx
+
+A saved estimate is a priced-lines file (CSV, Parquet or the "Lines" sheet
+of an .xlsx) as written by the app, wl_batch or wl_campaign: it carries the
+section inputs, the selected codes and any quantity overrides. All estimates
+are joined to the new rate table in one pass and only lines whose rates
+changed are repriced. Lines are matched to their own sheet row through
+Reference and Specification 2 as well as the code; keys that still match
+rows with different rates are reported as ambiguous and never repriced.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from wl_cache import load_rate_sheet
+from wl_index import decode_categories
+from wl_pricing import divider_mask, price_arrays, rate_cols
+
+# Lines are matched to rate rows on these columns (blanks normalised to "")
+key_cols = ["Package", "Service Name", "Reference", "Specification 1", "Specification 2"]
+blank_key_cols = ["Service Name", "Reference", "Specification 2"]
+section_cols = ["Estimate", "Well", "Hole Section"]
+
+
+def _keys(frame):
+    keys = decode_categories(frame.reindex(columns=key_cols))
+    for col in blank_key_cols:
+        keys[col] = keys[col].astype(object).where(keys[col].notna(), "")
+    return keys
+
+
+def _rate_table(rates):
+    """Numeric rate columns, one row per key; "Ambiguous" marks keys whose rows have different rates."""
+    table = _keys(rates)
+    for col in rate_cols:
+        table[col] = pd.to_numeric(rates[col], errors="coerce").fillna(0) if col in rates.columns else 0.0
+    # Repeated identical rows are harmless; the same key with different rates cannot be matched
+    table = table.drop_duplicates(key_cols + rate_cols)
+    table["Ambiguous"] = table.duplicated(key_cols, keep=False).to_numpy()
+    return table.drop_duplicates(key_cols, keep="first")
+
+
+def diff_rate_tables(old_rates, new_rates):
+    """Codes whose rates were added, removed or changed between two rate sheets.
+
+    Returns one row per key with a "Change" column and old/new values for
+    every rate column. Keys with several differently priced rows in either
+    sheet are reported as "ambiguous" (values shown are the first row's).
+    """
+    old = _rate_table(old_rates)
+    new = _rate_table(new_rates)
+    merged = old.merge(new, on=key_cols, how="outer", suffixes=(" (old)", " (new)"), indicator=True)
+    changed = np.zeros(len(merged), dtype=bool)
+    for col in rate_cols:
+        changed |= ~np.isclose(merged[f"{col} (old)"].to_numpy(dtype=float), merged[f"{col} (new)"].to_numpy(dtype=float))
+    ambiguous = (merged["Ambiguous (old)"].fillna(False) | merged["Ambiguous (new)"].fillna(False)).to_numpy(dtype=bool)
+    merged["Change"] = np.select(
+        [ambiguous, merged["_merge"] == "left_only", merged["_merge"] == "right_only", changed],
+        ["ambiguous", "removed", "added", "changed"],
+        "unchanged",
+    )
+    merged = merged.drop(columns=["_merge", "Ambiguous (old)", "Ambiguous (new)"])
+    return merged[merged["Change"] != "unchanged"].reset_index(drop=True)
+
+
+def estimate_lines(sections, well=None):
+    """Priced lines of every section in one frame, in the saved-estimate layout."""
+    frames = []
+    for hole_size, _, priced_df, _ in sections:
+        lines = priced_df.copy()
+        lines.insert(0, "Hole Section", hole_size)
+        lines.insert(0, "Well", well)
+        frames.append(lines)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["Well", "Hole Section"])
+
+
+def read_estimate(path):
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".parquet":
+        lines = pd.read_parquet(path)
+    elif suffix == ".xlsx":
+        lines = pd.read_excel(path, sheet_name="Lines")
+    else:
+        lines = pd.read_csv(path, dtype={"Hole Section": str})
+    if "Estimate" not in lines.columns:
+        lines.insert(0, "Estimate", path.stem)
+    return lines
+
+
+def reprice_estimates(lines, new_rates):
+    """Reprice saved lines (one or many estimates concatenated) against new_rates.
+
+    Adds "Rate Status" (unchanged / changed / missing / ambiguous), "New Total
+    (MYR)" and "Delta (MYR)"; lines missing from the new sheet, or matching
+    several differently priced rows of it, keep their old price.
+    """
+    lines = lines.reset_index(drop=True).copy()
+    for col in section_cols:
+        if col not in lines.columns:
+            lines[col] = ""
+    keys = _keys(lines)
+    keys["_line"] = np.arange(len(lines))
+
+    joined = keys.merge(_rate_table(new_rates), on=key_cols, how="left", indicator=True).sort_values("_line")
+    dividers = divider_mask(lines)
+    matched = (joined["_merge"] == "both").to_numpy() & ~dividers
+    ambiguous = matched & joined["Ambiguous"].fillna(False).to_numpy(dtype=bool)
+    found = matched & ~ambiguous
+
+    old_total = pd.to_numeric(lines["Total (MYR)"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    changed = np.zeros(len(lines), dtype=bool)
+    for col in rate_cols:
+        old_rate = pd.to_numeric(lines[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+        changed |= found & ~np.isclose(old_rate, joined[col].to_numpy(dtype=float))
+
+    # Only changed lines go back through the pricing formula
+    repriced = lines.loc[changed].copy()
+    for col in rate_cols:
+        repriced[col] = joined.loc[changed, col].to_numpy()
+    rental, operating = price_arrays(repriced)
+
+    new_total = old_total.copy()
+    new_total[changed] = rental + operating
+    for col in rate_cols:
+        lines.loc[changed, col] = repriced[col].to_numpy()
+    if changed.any():
+        lines.loc[changed, "Rental Charge (MYR)"] = rental
+        lines.loc[changed, "Operating Charge (MYR)"] = operating
+
+    lines["Rate Status"] = np.select(
+        [changed, ambiguous, found | dividers], ["changed", "ambiguous", "unchanged"], "missing"
+    )
+    lines["Old Total (MYR)"] = old_total
+    lines["New Total (MYR)"] = new_total
+    lines["Delta (MYR)"] = new_total - old_total
+    lines["Total (MYR)"] = new_total
+    return lines
+
+
+def section_deltas(repriced):
+    """Old/new totals and delta per estimate and hole section."""
+    return repriced.groupby(section_cols, sort=False, dropna=False)[
+        ["Old Total (MYR)", "New Total (MYR)", "Delta (MYR)"]
+    ].sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprice saved estimates against a revised rate sheet.")
+    parser.add_argument("old_rates", help="rate workbook the estimates were priced with")
+    parser.add_argument("new_rates", help="revised rate workbook")
+    parser.add_argument("estimates", nargs="+", help="saved priced-lines files (.csv, .parquet, .xlsx)")
+    parser.add_argument("-o", "--output", default="reprice.xlsx", help="result workbook (.xlsx)")
+    parser.add_argument("--sheet", default="Data", help="rate sheet name")
+    args = parser.parse_args(argv)
+
+    old_rates = load_rate_sheet(args.old_rates, sheet_name=args.sheet)
+    new_rates = load_rate_sheet(args.new_rates, sheet_name=args.sheet)
+    rate_diff = diff_rate_tables(old_rates, new_rates)
+
+    lines = pd.concat([read_estimate(path) for path in args.estimates], ignore_index=True)
+    repriced = reprice_estimates(lines, new_rates)
+    sections = section_deltas(repriced)
+
+    with pd.ExcelWriter(args.output, engine="openpyxl") as writer:
+        sections.to_excel(writer, sheet_name="Section Deltas")
+        repriced[repriced["Rate Status"] != "unchanged"].to_excel(writer, sheet_name="Line Deltas", index=False)
+        rate_diff.to_excel(writer, sheet_name="Rate Changes", index=False)
+
+    with pd.option_context("display.float_format", "{:,.2f}".format):
+        print(sections.to_string())
+    counts = repriced["Rate Status"].value_counts()
+    ambiguous = rate_diff["Change"] == "ambiguous"
+    print(
+        f"{(~ambiguous).sum()} rate change(s), {ambiguous.sum()} ambiguous key(s); "
+        f"{counts.get('changed', 0)} line(s) repriced, {counts.get('missing', 0)} missing from the new sheet, "
+        f"{counts.get('ambiguous', 0)} ambiguous -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+
+import pandas as pd
+
+from wl_catalog import catalog, quantity_exceptions, special_cases_map, special_codes_map
+from wl_core import expand_codes, line_quantities
+from wl_index import decode_categories, select_tools
+from wl_pricing import assign_flat_charges, numeric_cols, recalc_costs
+
+# Hole-section pipeline without any Streamlit calls, shared by the app and the batch CLI
+
+# Sidebar inputs that apply to every line of a section (quantity goes through apply_quantities)
+section_input_cols = [
+    "Total Days", "Total Months", "Total Depth (ft)", "Total Survey (ft)", "Total Hours", "Discount (%)"
+]
+# Tool group of lines outside every special-case group
+individual_group = "(Individual tools)"
+
+
+def section_fingerprint(*parts):
+    """Stable hash of a section's inputs, used to skip recomputing unchanged tabs."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def build_display_table(df_tools, used_special_cases, special_cases, special_codes=None):
+    """Group rows under "--- group ---" dividers, followed by the non-special tools.
+
+    `special_codes` is the precomputed set of every code in `special_cases`.
+    """
+    if special_codes is None:
+        special_codes = {code for codes in special_cases.values() for code in codes}
+
+    # --- Special cases: one (group, item) order table joined to the tool rows ---
+    order = pd.DataFrame(
+        [(g, i, item) for g, sc in enumerate(used_special_cases) for i, item in enumerate(special_cases[sc])],
+        columns=["_group", "_item", "Specification 1"],
+    )
+    tools = df_tools.reset_index(drop=True)
+    tools["_row"] = range(len(tools))
+    items = order.merge(tools, on="Specification 1", how="inner")
+
+    # --- Divider rows, added in bulk; numeric columns hold 0 (dividers are priced at 0
+    # anyway) so the rate columns keep their float dtype through the concat ---
+    numeric = [col for col, dtype in df_tools.dtypes.items() if pd.api.types.is_numeric_dtype(dtype)]
+    dividers = pd.DataFrame("", index=range(len(used_special_cases)), columns=df_tools.columns)
+    dividers[numeric] = 0
+    dividers = dividers.astype(df_tools.dtypes[numeric].to_dict())
+    dividers["Specification 1"] = [f"--- {sc} ---" for sc in used_special_cases]
+    dividers["_group"] = range(len(used_special_cases))
+    dividers["_item"] = -1
+    dividers["_row"] = -1
+
+    display_rows = []
+    if used_special_cases:
+        grouped = pd.concat([dividers, items], ignore_index=True) if not items.empty else dividers
+        grouped = grouped.sort_values(["_group", "_item", "_row"], kind="stable")
+        display_rows.append(grouped[list(df_tools.columns)])
+
+    # --- Non-special tools ---
+    non_special_mask = ~df_tools["Specification 1"].isin(special_codes)
+    non_special_df = df_tools[non_special_mask]
+    if not non_special_df.empty:
+        display_rows.append(non_special_df)
+
+    # --- Combine ---
+    if display_rows:
+        return pd.concat(display_rows, ignore_index=True)
+    return df_tools
+
+
+def tool_groups(lines, code_groups):
+    """Tool group of each line of a display table: the divider above it if the code is one of its
+    codes, else individual_group (lines added after the groups, codes outside every group).
+
+    `code_groups` is the service's {code: groups} map from the catalog (code_groups_map).
+    """
+    specs = lines["Specification 1"].astype(str)
+    dividers = specs.str.startswith("---")
+    group = specs.where(dividers).str.slice(4, -4).ffill()
+    member = [
+        divider or name in code_groups.get(spec, ()) for spec, name, divider in zip(specs, group, dividers)
+    ]
+    return group.where(member, individual_group)
+
+
+def set_section_inputs(df, inputs):
+    """Write the section-wide inputs (days, months, depth, ...) onto every row."""
+    for col in section_input_cols:
+        df[col] = inputs.get(col, 0)
+    return df
+
+
+def build_calc_table(display_df, inputs):
+    """Calculated-cost table for a display table, with flat charges assigned.
+
+    The calc table is a shallow copy: the steps below (and apply_quantities /
+    recalc_costs) only replace whole columns, so the display table's rate and
+    text columns are shared rather than duplicated.
+    """
+    calc_df = display_df.copy(deep=False)
+
+    # Ensure all numeric columns exist
+    for col in numeric_cols:
+        if col not in calc_df.columns:
+            calc_df[col] = 0
+
+    set_section_inputs(calc_df, inputs)
+    calc_df["Total Flat Charge"] = 0  # Start from 0
+
+    # Apply Total Flat Charge per group (later groups win, as before)
+    calc_df["Total Flat Charge"] = assign_flat_charges(
+        calc_df["Specification 1"], catalog["flat_charge_index"], calc_df["Total Flat Charge"],
+        known=catalog["flat_charges"],
+    )
+    return calc_df
+
+
+def apply_quantities(df, well, hole, sidebar_qty, overrides=None):
+    """Apply the well's quantity exceptions, then the sidebar quantity to all other rows.
+
+    `overrides` replaces the catalog's {code: quantity} exceptions for the well
+    and hole (see wl_wells.quantity_overrides). Codes are matched exactly: the
+    sheet's codes were trimmed and put in catalog spelling at load (see wl_normalize).
+    """
+    df = df.copy(deep=False)
+
+    exceptions_map = quantity_exceptions.get(well, {}).get(hole, {}) if overrides is None else overrides
+
+    # Sidebar quantity everywhere, then the exceptions on top
+    df["Quantity of Tools"] = line_quantities(df["Specification 1"].to_numpy(dtype=object), sidebar_qty, exceptions_map)
+    return df
+
+
+def flat_charge_sections(priced_df):
+    """{"FlatCharge_<n>": [codes]} for every positive Total Flat Charge, used by the Excel export."""
+    sections = {}
+    for charge_value in priced_df["Total Flat Charge"].unique():
+        if charge_value > 0:
+            tools = priced_df.loc[priced_df["Total Flat Charge"] == charge_value, "Specification 1"].tolist()
+            sections[f"FlatCharge_{charge_value}"] = tools
+    return sections
+
+
+def section_tables(df, package, service, selected_codes, inputs, well=None, hole=None, overrides=None):
+    """(display_df, priced_df) for a section as the app's tab builds them, or (None, None) if no code matches."""
+    special_cases = special_cases_map.get(service, {})
+    expanded_codes, used_special_cases = expand_codes(selected_codes, special_cases)
+    df_tools = select_tools(df, package, service, expanded_codes)
+    if df_tools.empty:
+        return None, None
+    display_df = build_display_table(df_tools, used_special_cases, special_cases, special_codes_map.get(service))
+    calc_df = build_calc_table(display_df, inputs)
+    calc_df = apply_quantities(calc_df, well, hole, inputs.get("Quantity of Tools", 0), overrides)
+    return display_df, recalc_costs(calc_df).reset_index(drop=True)
+
+
+def price_section(df, package, service, selected_codes, inputs, well=None, hole=None, overrides=None):
+    """Price one hole section end to end, as the app does for a tab (see section_tables).
+
+    `inputs` holds "Quantity of Tools" plus the section_input_cols values, with
+    "Discount (%)" in percent. Returns (priced_df, used_special_cases); priced_df
+    is empty when none of the selected codes exist for the package/service.
+    """
+    _, used_special_cases = expand_codes(selected_codes, special_cases_map.get(service, {}))
+    _, priced_df = section_tables(df, package, service, selected_codes, inputs, well, hole, overrides)
+    if priced_df is None:
+        return recalc_costs(decode_categories(df.iloc[[]])), used_special_cases
+    return priced_df, used_special_cases
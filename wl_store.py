@@ -0,0 +1,152 @@
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from wl_cache import CACHE_DIR
+from wl_pricing import numeric_cols
+
+# Local SQLite store of saved estimates and their priced lines, so past
+# estimates can be listed, loaded and compared without re-uploading the rate
+# sheet or re-selecting tools. One row per estimate, one row per priced line.
+
+STORE_PATH = Path(os.environ.get("WL_CE_STORE", CACHE_DIR / "estimates.sqlite"))
+
+text_cols = ["Well", "Hole Section", "Package", "Service Name", "Reference", "Specification 1", "Specification 2"]
+charge_cols = ["Rental Charge (MYR)", "Operating Charge (MYR)", "Total (MYR)"]
+line_cols = text_cols + numeric_cols + charge_cols
+# query_lines filter names -> indexed columns of the lines table
+indexed_cols = {
+    "well": "Well", "section": "Hole Section", "package": "Package",
+    "service": "Service Name", "spec": "Specification 1",
+}
+
+
+def _quote(col):
+    return '"' + col.replace('"', '""') + '"'
+
+
+def _schema():
+    columns = ", ".join(
+        f"{_quote(c)} {'TEXT' if c in text_cols else 'REAL'}" for c in line_cols
+    )
+    statements = [
+        "CREATE TABLE IF NOT EXISTS estimates ("
+        "id INTEGER PRIMARY KEY, name TEXT NOT NULL, well TEXT, rate_sheet TEXT, "
+        "created_at TEXT NOT NULL, grand_total REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS lines ("
+        "estimate_id INTEGER NOT NULL REFERENCES estimates(id) ON DELETE CASCADE, "
+        f"line_no INTEGER NOT NULL, {columns}, PRIMARY KEY (estimate_id, line_no))",
+        "CREATE INDEX IF NOT EXISTS idx_estimates_well ON estimates(well)",
+    ]
+    for name, col in indexed_cols.items():
+        statements.append(f"CREATE INDEX IF NOT EXISTS idx_lines_{name} ON lines({_quote(col)})")
+    return statements
+
+
+def connect(path=None):
+    """Open the store, creating the file and schema on first use."""
+    path = Path(path or STORE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    with conn:
+        for statement in _schema():
+            conn.execute(statement)
+    return conn
+
+
+def _line_rows(estimate_id, lines):
+    frame = lines.reindex(columns=line_cols)
+    for col in text_cols:
+        frame[col] = [None if pd.isna(v) else str(v) for v in frame[col]]
+    for col in numeric_cols + charge_cols:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").fillna(0).astype(float)
+    return ((estimate_id, i, *row) for i, row in enumerate(frame.itertuples(index=False, name=None)))
+
+
+def save_estimate(lines, name, well=None, rate_sheet=None, path=None):
+    """Insert an estimate and all its priced lines in one transaction; returns the estimate id."""
+    if not name or not str(name).strip():
+        raise ValueError("estimate name must not be empty")
+    total = pd.to_numeric(lines.get("Total (MYR)", pd.Series(dtype=float)), errors="coerce").fillna(0).sum()
+    placeholders = ", ".join("?" * (len(line_cols) + 2))
+    insert = f"INSERT INTO lines (estimate_id, line_no, {', '.join(map(_quote, line_cols))}) VALUES ({placeholders})"
+    with closing(connect(path)) as conn, conn:
+        cur = conn.execute(
+            "INSERT INTO estimates (name, well, rate_sheet, created_at, grand_total) VALUES (?, ?, ?, ?, ?)",
+            (str(name).strip(), well, rate_sheet, pd.Timestamp.now().isoformat(timespec="seconds"), float(total)),
+        )
+        estimate_id = cur.lastrowid
+        conn.executemany(insert, _line_rows(estimate_id, lines))
+    return estimate_id
+
+
+def list_estimates(well=None, path=None):
+    """Saved estimates, newest first, optionally for one well."""
+    query = "SELECT id, name, well, rate_sheet, created_at, grand_total FROM estimates"
+    params = ()
+    if well is not None:
+        query += " WHERE well = ?"
+        params = (well,)
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(query + " ORDER BY id DESC", conn, params=params)
+
+
+def delete_estimate(estimate_id, path=None):
+    with closing(connect(path)) as conn, conn:
+        conn.execute("DELETE FROM estimates WHERE id = ?", (int(estimate_id),))
+
+
+def query_lines(estimate_ids=None, path=None, **filters):
+    """Priced lines, filtered by estimate id and any of well/section/package/service/spec.
+
+    Each filter takes one value or a list of values and hits the matching index.
+    The result has an "Estimate" column with the estimate name, in the
+    saved-estimate layout read by wl_reprice.
+    """
+    where, params = [], []
+    if estimate_ids is not None:
+        ids = [int(i) for i in ([estimate_ids] if isinstance(estimate_ids, int) else estimate_ids)]
+        where.append(f"l.estimate_id IN ({', '.join('?' * len(ids))})")
+        params += ids
+    for key, value in filters.items():
+        if key not in indexed_cols:
+            raise ValueError(f"unknown filter {key!r}; expected one of {', '.join(indexed_cols)}")
+        values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        where.append(f"l.{_quote(indexed_cols[key])} IN ({', '.join('?' * len(values))})")
+        params += values
+    query = (
+        f"SELECT e.name AS Estimate, {', '.join('l.' + _quote(c) for c in line_cols)} "
+        "FROM lines l JOIN estimates e ON e.id = l.estimate_id"
+    )
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    with closing(connect(path)) as conn:
+        return pd.read_sql_query(query + " ORDER BY l.estimate_id, l.line_no", conn, params=params)
+
+
+def load_estimate(estimate_id, path=None):
+    return query_lines(estimate_id, path=path)
+
+
+def compare_estimates(estimate_ids, path=None):
+    """Section totals of several estimates side by side (one column per estimate)."""
+    ids = [int(i) for i in estimate_ids]
+    if not ids:
+        return pd.DataFrame()
+    query = (
+        "SELECT e.id || ': ' || e.name AS Estimate, l.\"Hole Section\" AS Section, SUM(l.\"Total (MYR)\") AS Total "
+        "FROM lines l JOIN estimates e ON e.id = l.estimate_id "
+        f"WHERE l.estimate_id IN ({', '.join('?' * len(ids))}) "
+        "GROUP BY l.estimate_id, l.\"Hole Section\" ORDER BY l.estimate_id, MIN(l.line_no)"
+    )
+    with closing(connect(path)) as conn:
+        totals = pd.read_sql_query(query, conn, params=ids)
+    table = totals.pivot_table(index="Section", columns="Estimate", values="Total", aggfunc="sum", sort=False).fillna(0)
+    table.loc["Grand Total"] = table.sum()
+    return table
@@ -0,0 +1,38 @@
+import json
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Lightweight per-stage wall-time records for one rerun: a plain list of dicts
+
+
+@contextmanager
+def stage(records, name, section=None, rows=None):
+    """Time a block and append {"stage", "section", "rows", "ms"} to `records`.
+
+    The yielded dict can be updated inside the block, e.g. info["rows"] = len(df).
+    """
+    info = {"stage": name, "section": section, "rows": rows}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        info["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        records.append(info)
+
+
+def timings_frame(records):
+    return pd.DataFrame(records, columns=["stage", "section", "rows", "ms"])
+
+
+def timings_json(records, **meta):
+    """JSON document with run metadata (rate sheet, timestamp, ...) and the stage records."""
+    return json.dumps({**meta, "stages": records}, indent=2, default=str)
+
+
+def timings_csv(records, **meta):
+    df = timings_frame(records)
+    for key, value in meta.items():
+        df[key] = value
+    return df.to_csv(index=False)
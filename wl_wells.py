@@ -0,0 +1,154 @@
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from wl_catalog import freeze, quantity_exceptions, special_cases_map
+from wl_core import quantity_overrides as core_overrides
+from wl_index import list_packages, list_services, service_codes
+from wl_section import section_fingerprint, section_tables
+
+# Reference-well library: package/service picks, per-section inputs, tool groups
+# and quantity overrides for each well, kept in wl_wells.json (override with
+# WL_CE_WELLS) and loaded once per process, read-only like the catalog.
+#
+# Baselines: warm_baselines prices every section of every well against a rate
+# sheet, keyed by the same fingerprint the app computes for a tab (section_key).
+# The key covers the sheet and the well definition, so a baseline is only ever
+# replaced when one of those changes.
+
+WELLS_PATH = Path(os.environ.get("WL_CE_WELLS", Path(__file__).with_name("wl_wells.json")))
+
+# Section inputs a well may set, with the app's defaults; all but the discount are whole numbers
+input_defaults = {
+    "Quantity of Tools": 2, "Total Days": 0, "Total Months": 1, "Total Depth (ft)": 5500,
+    "Total Survey (ft)": 0, "Total Hours": 0, "Discount (%)": 0.0,
+}
+# Session-state key prefix of the sidebar widget behind each input
+input_keys = {
+    "Quantity of Tools": "qty", "Total Days": "days", "Total Months": "months", "Total Depth (ft)": "depth",
+    "Total Survey (ft)": "survey", "Total Hours": "hours", "Discount (%)": "disc",
+}
+section_keys = set(input_defaults) | {"Package", "Service", "Tool Groups", "Quantity Overrides"}
+
+
+def validate_wells(raw):
+    """Raise ValueError if the raw well library does not have the expected shape."""
+    if not isinstance(raw, dict):
+        raise ValueError("well library must be a JSON object")
+    for well, info in raw.items():
+        sections = info.get("Hole Sections") if isinstance(info, dict) else None
+        if not isinstance(sections, dict) or not sections:
+            raise ValueError(f"{well!r}: expected a non-empty 'Hole Sections' object")
+        for hole, section in sections.items():
+            where = f"{well!r}[{hole!r}]"
+            unknown = set(section) - section_keys
+            if unknown:
+                raise ValueError(f"{where}: unknown field(s) {', '.join(sorted(unknown))}")
+            for col, default in input_defaults.items():
+                value = section.get(col, default)
+                if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                    raise ValueError(f"{where}: {col} must be a non-negative number")
+                if isinstance(default, int) and value != int(value):
+                    raise ValueError(f"{where}: {col} must be a whole number")
+            groups = section.get("Tool Groups", [])
+            if not isinstance(groups, list) or not all(isinstance(g, str) for g in groups):
+                raise ValueError(f"{where}: 'Tool Groups' must be a list of names")
+            if not all(isinstance(q, (int, float)) for q in section.get("Quantity Overrides", {}).values()):
+                raise ValueError(f"{where}: quantity overrides must be numbers")
+
+
+@lru_cache(maxsize=4)
+def load_wells(path=WELLS_PATH):
+    """(read-only library, {well: definition fingerprint}) for `path`, cached for the life of the process."""
+    with open(path, encoding="utf-8") as fh:
+        raw = json.load(fh)
+    validate_wells(raw)
+    return freeze(raw), {well: section_fingerprint(info) for well, info in raw.items()}
+
+
+reference_wells, well_fingerprints = load_wells()
+
+
+def _match(value, options):
+    """`value` as spelled in `options` (exact, then ignoring case and spaces), or None."""
+    if value in options:
+        return value
+    folded = str(value or "").strip().casefold()
+    return next((opt for opt in options if str(opt).strip().casefold() == folded), None)
+
+
+def section_inputs(section):
+    """Sidebar inputs of a library section, typed as the app's number inputs return them."""
+    return {
+        col: float(section.get(col, default)) if isinstance(default, float) else int(section.get(col, default))
+        for col, default in input_defaults.items()
+    }
+
+
+def quantity_overrides(well, hole):
+    """Quantity exceptions for a section: the catalog's for the well, then the library's on top."""
+    section = reference_wells.get(well, {}).get("Hole Sections", {}).get(hole, {})
+    return core_overrides(quantity_exceptions, well, hole, section.get("Quantity Overrides"))
+
+
+def section_key(rate_key, well, hole, package, service, codes, inputs):
+    """Fingerprint of a tab's inputs, including the reference well's definition."""
+    return section_fingerprint(rate_key, well, well_fingerprints.get(well), hole, package, service, codes, inputs)
+
+
+def resolve_well(df, well):
+    """{hole: {"package", "service", "tools", "inputs"}} as the app's tabs pick them on this sheet.
+
+    Package and service fall back to the first option, as an unset selectbox
+    does; tool groups and codes the service does not offer are dropped.
+    """
+    info = reference_wells[well]
+    packages = list_packages(df)
+    resolved = {}
+    for hole, section in info["Hole Sections"].items():
+        package = _match(section.get("Package", info.get("Package")), packages)
+        if package is None:
+            package = packages[0] if packages else None
+        services = list_services(df, package)
+        service = _match(section.get("Service", info.get("Service")), services)
+        if service is None:
+            service = services[0] if services else ""
+        options = set(special_cases_map.get(service, {})) | set(service_codes(df, package, service))
+        resolved[hole] = {
+            "package": package,
+            "service": service,
+            "tools": [tool for tool in dict.fromkeys(section.get("Tool Groups", [])) if tool in options],
+            "inputs": section_inputs(section),
+        }
+    return resolved
+
+
+def well_defaults(df, well):
+    """Session-state values that fill every tab of the app with a library well."""
+    state = {}
+    for hole, section in resolve_well(df, well).items():
+        for col, value in section["inputs"].items():
+            state[f"{input_keys[col]}_{hole}"] = value
+        state[f"pkg_{hole}"] = section["package"]
+        state[f"svc_{hole}"] = section["service"]
+        state[f"tools_{hole}"] = list(section["tools"])
+    return state
+
+
+def warm_baselines(df, rate_key, progress=None):
+    """{section_key: (display_df, priced_df)} for every section of every library well on this sheet."""
+    baselines = {}
+    wells = list(reference_wells)
+    for done, well in enumerate(wells, 1):
+        for hole, section in resolve_well(df, well).items():
+            key = section_key(
+                rate_key, well, hole, section["package"], section["service"], section["tools"], section["inputs"]
+            )
+            baselines[key] = section_tables(
+                df, section["package"], section["service"], section["tools"], section["inputs"],
+                well, hole, quantity_overrides(well, hole),
+            )
+        if progress:
+            progress(done / len(wells))
+    return baselines